@@ -1,5 +1,4 @@
 #!/bin/bash
 
-curl -s https://www.stadafa.com/2021/09/every-worlde-word-so-far-updated-daily.html \
-    | grep -Po '^<p>[0-9]+\. \K(\w+?) '\
-    | tr 'A-Z' 'a-z'
+# Refresh the local used-word store and print every used word
+"$(dirname "$(readlink -f "$BASH_SOURCE")")"/wordle refresh-used --list "$@"
@@ -0,0 +1,109 @@
+# Headless solver runs: play every answer word against the solver using Wordle.makeGYB
+# as the oracle and report how many guesses it took and how long each row took.
+
+import time
+import math
+from collections import Counter
+
+from parallel import forkPool, shared, splitWork
+
+MAX_ROWS = 6      # A game that needs more rows than this is a failure
+PLAY_LIMIT = 12   # Stop playing a game after this many rows
+
+
+class GameResult:
+    def __init__(self, secret: str, guesses: list[str], rowTimes: list[float],
+                 solved: bool) -> None:
+        self.secret = secret
+        self.guesses = guesses
+        self.rowTimes = rowTimes
+        self.solved = solved
+
+    @property
+    def failed(self) -> bool:
+        return not self.solved or len(self.guesses) > MAX_ROWS
+
+
+def nextGuess(antiWords: list[str], words: list[str]) -> str:
+    '''Guess a candidate once there are only two left, otherwise the top ranked guess'''
+    if len(words) <= 2 or not antiWords:
+        return words[0]
+    return antiWords[0]
+
+
+def playGame(wordle, secret: str, opener: str) -> GameResult:
+    '''Play one game headless with wordle, which must already be reset'''
+    guesses = [opener]
+    rowTimes: list[float] = []
+    while True:
+        wordle.wordleLines[-1] = wordle.makeGYB(guesses[-1], secret)
+        if wordle.allGreen():
+            return GameResult(secret, guesses, rowTimes, True)
+        if len(guesses) >= PLAY_LIMIT:
+            return GameResult(secret, guesses, rowTimes, False)
+        start = time.perf_counter()
+        wordle.makeConstraints()
+        words = wordle.calculateWords()
+        antiWords = wordle.mkGuessList(words) if words else []
+        rowTimes.append(time.perf_counter() - start)
+        wordle.recordRow(words, secret=secret)
+        if not words:
+            return GameResult(secret, guesses, rowTimes, False)
+        guesses.append(nextGuess(antiWords, words))
+        wordle.newWordleLine()
+
+
+def runBench(wordle, secrets: list[str], opener: str | None = None) -> list[GameResult]:
+    if opener is None:
+        opener = wordle.openingGuesses()[0]
+    results = []
+    for secret in secrets:
+        wordle.reset()
+        results.append(playGame(wordle, secret, opener))
+    return results
+
+
+def _benchChunk(args) -> list[GameResult]:
+    secrets, opener = args
+    return runBench(shared('wordle'), secrets, opener)
+
+
+def runBenchParallel(wordle, secrets: list[str], workers: int) -> list[GameResult]:
+    '''runBench with the secrets split across forked worker processes'''
+    opener = wordle.openingGuesses()[0]
+    with forkPool(workers, wordle=wordle) as pool:
+        chunks = pool.map(_benchChunk, [(chunk, opener) for chunk in splitWork(secrets, workers)])
+    return [result for chunk in chunks for result in chunk]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def benchReport(results: list[GameResult], wallTime: float,
+                priors: dict[str, float] | None = None) -> str:
+    '''priors, if given, also weight the mean guesses by how likely each answer is'''
+    distribution = Counter(len(r.guesses) for r in results if r.solved)
+    failures = [r for r in results if r.failed]
+    rowTimes = [t for r in results for t in r.rowTimes]
+    solvedGuesses = [len(r.guesses) for r in results if r.solved]
+    lines = [f'Games: {len(results)}']
+    lines.append('Guesses: ' + ', '.join(f'{n}: {distribution[n]}' for n in sorted(distribution)))
+    if solvedGuesses:
+        lines.append(f'Mean guesses (solved): {sum(solvedGuesses) / len(solvedGuesses):.3f}')
+    if priors and solvedGuesses:
+        weights = [(priors.get(r.secret, 0.0), len(r.guesses)) for r in results if r.solved]
+        weighted = sum(w * n for w, n in weights) / max(1e-12, sum(w for w, _ in weights))
+        lines.append(f'Prior weighted mean guesses (solved): {weighted:.3f}')
+    lines.append(f'Failures (> {MAX_ROWS} rows): {len(failures)} '
+                 f'({100 * len(failures) / max(1, len(results)):.2f}%)')
+    if failures:
+        lines.append('Failed words: ' + ', '.join(r.secret for r in failures[:20]))
+    if rowTimes:
+        lines.append(f'Row latency: mean {1000 * sum(rowTimes) / len(rowTimes):.3f}ms, '
+                     f'p99 {1000 * percentile(rowTimes, 0.99):.3f}ms over {len(rowTimes)} rows')
+    lines.append(f'Wall time: {wallTime:.2f}s')
+    return '\n'.join(lines)
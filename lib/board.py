@@ -0,0 +1,78 @@
+# Compact, hashable board model: a row is the guessed word plus its packed base-3 pattern,
+# and a board is an immutable sequence of rows, so board states can key caches.
+
+from typing import Iterator
+
+from patterns import BLACK, unpackPattern, patternToStr, patternFromLine, KEY_TYPE_DIGITS
+from utils import KeyStroke
+
+DIGIT_KEY_TYPES = {digit: keyType for keyType, digit in KEY_TYPE_DIGITS.items()}
+
+
+class Row:
+    __slots__ = ('word', 'pattern')
+
+    def __init__(self, word: str, pattern: int) -> None:
+        self.word = word
+        self.pattern = pattern
+
+    @classmethod
+    def fromLine(cls, line) -> 'Row':
+        '''From a complete WordleLine of KeyStrokes'''
+        return cls(''.join(key.key for key in line), patternFromLine(line))
+
+    def toLine(self) -> list[KeyStroke]:
+        '''The KeyStrokes that enter this row, the inverse of fromLine'''
+        return [KeyStroke(letter, DIGIT_KEY_TYPES[digit]) for letter, digit in self.tiles()]
+
+    def tiles(self) -> Iterator[tuple[str, int]]:
+        '''(letter, digit) for each tile'''
+        return zip(self.word, unpackPattern(self.pattern, len(self.word)))
+
+    def goodLetters(self) -> set[str]:
+        return {letter for letter, digit in self.tiles() if digit != BLACK}
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Row) and self.word == other.word and self.pattern == other.pattern
+
+    def __hash__(self) -> int:
+        return hash((self.word, self.pattern))
+
+    def __repr__(self) -> str:
+        return f'Row({self.word!r}, {patternToStr(self.pattern, len(self.word))!r})'
+
+
+class Board:
+    '''Immutable sequence of committed rows, add() returns a new board'''
+    __slots__ = ('rows', '_hash')
+
+    def __init__(self, rows: tuple[Row, ...] = ()) -> None:
+        self.rows = rows
+        self._hash: int | None = None
+
+    def add(self, row: Row) -> 'Board':
+        return Board(self.rows + (row,))
+
+    def signature(self) -> tuple[tuple[str, int], ...]:
+        '''Canonical, picklable form of the board'''
+        return tuple((row.word, row.pattern) for row in self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i: int) -> Row:
+        return self.rows[i]
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self.rows)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Board) and self.rows == other.rows
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self.rows)
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f'Board({", ".join(repr(row) for row in self.rows)})'
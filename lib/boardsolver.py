@@ -0,0 +1,130 @@
+# Headless board evaluation for the server and batch tools: a board is a list of
+# (guess, pattern) rows, with patterns given as "GYBBB" strings or packed integers.
+# With a BoardCache the candidates after each row and the ranked guesses are memoised by
+# board, under the same keys as the interactive Wordle uses, so a board repeated across
+# requests or records is only filtered and ranked once.
+
+import numpy as np
+
+from constraints import Constraints
+from patterns import patternFromStr, patternToStr, allGreen
+from strategy import GuessScorer, HEURISTIC, ENTROPY
+from utils import ScriptError
+from book import OpeningBook
+from board import Row, Board
+from cache import BoardCache
+
+RowInput = tuple[str, int]
+CACHED_GUESSES = 10  # Guesses ranked and cached per board, as many as Wordle.mkGuessList keeps
+
+
+def parseRows(rows: list, wordLen: int = 5) -> list[RowInput]:
+    '''Validate [[guess, pattern], ...] from JSON, raising ValueError on bad input'''
+    if not isinstance(rows, list):
+        raise ValueError('Expected a list of [guess, pattern] rows')
+    parsed = []
+    for row in rows:
+        if not isinstance(row, (list, tuple)) or len(row) != 2:
+            raise ValueError(f'Bad row {row!r}, expected [guess, pattern]')
+        guess, pattern = row
+        if not isinstance(guess, str) or len(guess) != wordLen \
+                or not (guess.isascii() and guess.isalpha()):
+            raise ValueError(f'Bad guess {guess!r}, expected {wordLen} letters')
+        if isinstance(pattern, str):
+            pattern = pattern.replace('\ufe0f', '')  # Emoji variation selectors
+            if len(pattern) != wordLen:
+                raise ValueError(f'Bad pattern {pattern!r}, expected {wordLen} of G, Y and B')
+            pattern = patternFromStr(pattern)
+        if not isinstance(pattern, int) or not 0 <= pattern <= allGreen(wordLen):
+            raise ValueError(f'Bad pattern {pattern!r}')
+        parsed.append((guess.lower(), pattern))
+    return parsed
+
+
+class BoardState:
+    '''Constraints and candidates for one board, narrowed a row at a time'''
+    def __init__(self, solver: 'BoardSolver') -> None:
+        self.solver = solver
+        self.rows = Board()
+        self.constraints = Constraints(solver.wordLen)
+        self.candidates: np.ndarray | None = None
+        self.solved = False
+
+    def addRow(self, guess: str, pattern: int) -> None:
+        self.rows = self.rows.add(Row(guess, pattern))
+        if pattern == allGreen(len(guess)):
+            self.solved = True
+        self.constraints.addPattern(guess, pattern)
+        cache = self.solver.cache
+        key = self.solver.cacheKey('candidates', self.rows)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            self.candidates = cached
+            return
+        self.candidates = self.constraints.filter(self.solver.scorer.answerIndex, self.candidates)
+        if cache is not None:
+            cache.put(key, self.candidates)
+
+    def guesses(self, limit: int = 10) -> list[str]:
+        return self.solver.rankGuesses(self, limit)
+
+    def candidateIndexes(self) -> np.ndarray:
+        if self.candidates is None:
+            return np.arange(len(self.solver.scorer.answerIndex))
+        return self.candidates
+
+    def words(self) -> list[str]:
+        return self.solver.scorer.answerIndex.select(self.candidateIndexes())
+
+
+class BoardSolver:
+    def __init__(self, scorer: GuessScorer, strategy: str = ENTROPY,
+                 book: OpeningBook | None = None, cache: BoardCache | None = None) -> None:
+        if strategy == HEURISTIC:  # Needs a Wordle to pick anti-words, it scores nothing
+            raise ScriptError('BoardSolver needs the entropy or minimax strategy')
+        self.scorer = scorer
+        self.strategy = strategy
+        self.book = book
+        self.cache = cache
+        self.wordLen = scorer.answerIndex.codes.shape[1]
+        self.firstGuesses: list[str] | None = None
+
+    def cacheKey(self, kind: str, rows: Board) -> tuple:
+        '''As Wordle.cacheKey for the same board played without hard mode'''
+        strategy = ''
+        if kind == 'guesses':
+            strategy = self.strategy + ('-priors' if self.scorer.usePriors
+                                        and self.strategy == ENTROPY else '')
+        return kind, 'answers', strategy, rows.signature()
+
+    def board(self, rows: list[RowInput] | None = None) -> BoardState:
+        state = BoardState(self)
+        for guess, pattern in rows or []:
+            state.addRow(guess, pattern)
+        return state
+
+    def rankGuesses(self, state: BoardState, limit: int = 10) -> list[str]:
+        if state.solved:
+            return []
+        if not state.rows:
+            if self.firstGuesses is None:
+                self.firstGuesses = self.book.first if self.book is not None else \
+                    self.scorer.rank(np.arange(len(self.scorer.answerIndex)), self.strategy)
+            return self.firstGuesses[:limit]
+        if self.book is not None and len(state.rows) == 1:
+            first = state.rows[0]
+            bookWords = self.book.secondGuesses(first.word,
+                                                patternToStr(first.pattern, self.wordLen))
+            if bookWords is not None:
+                return bookWords[:limit]
+        assert state.candidates is not None
+        if len(state.candidates) == 0:
+            return []
+        key = self.cacheKey('guesses', state.rows)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None and len(cached) >= limit:
+            return cached[:limit]
+        guesses = self.scorer.rank(state.candidates, self.strategy, max(limit, CACHED_GUESSES))
+        if self.cache is not None:
+            self.cache.put(key, guesses)
+        return guesses[:limit]
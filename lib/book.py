@@ -0,0 +1,81 @@
+# Opening book: the best first guesses and, for every feedback to the first guess, the
+# best second guesses. Built offline with `wordle build-book` and keyed by a hash of the
+# word lists, the strategy and whether priors weighted it, so none of those changing ever
+# reads a stale book. The word lists are the ones loaded, before used words are removed,
+# so refreshing the used words keeps the book.
+
+import sys
+import json
+from os.path import join as pjoin, exists
+
+import numpy as np
+
+from patterns import WORDS_DIR, wordListsHash, patternToStr
+from strategy import GuessScorer, ENTROPY
+
+BOOK_WORDS = 10  # Guesses stored per book entry, matches what printWords shows
+
+
+def bookFile(strategy: str, wordLen: int = 5, usePriors: bool = False) -> str:
+    usePriors = usePriors and strategy == ENTROPY  # Only entropy is weighted by priors
+    suffix = ('' if wordLen == 5 else f'.len{wordLen}') + ('.priors' if usePriors else '')
+    return pjoin(WORDS_DIR, f'opening-book.{strategy}{suffix}.json')
+
+
+def bookKey(guesses: list[str], answers: list[str], strategy: str,
+            usePriors: bool = False) -> str:
+    usePriors = usePriors and strategy == ENTROPY
+    return f'{wordListsHash(guesses, answers)}-{strategy}{"-priors" if usePriors else ""}'
+
+
+class OpeningBook:
+    def __init__(self, key: str, first: list[str], second: dict[str, list[str]]) -> None:
+        self.key = key
+        self.first = first
+        self.second = second
+
+    def secondGuesses(self, firstGuess: str, patternStr: str) -> list[str] | None:
+        '''Book answer for the second row, None when the first guess was not the book's'''
+        if not self.first or firstGuess != self.first[0]:
+            return None
+        return self.second.get(patternStr)
+
+
+def buildBook(scorer: GuessScorer, strategy: str,
+              keyWords: tuple[list[str], list[str]] | None = None) -> OpeningBook:
+    '''keyWords, the (guesses, answers) the book is keyed on, default to the scorer's'''
+    candidates = np.arange(len(scorer.answerIndex))
+    first = scorer.rank(candidates, strategy, limit=BOOK_WORDS)
+    opener = np.array([scorer.guessIndex.position[first[0]]])
+    patterns = scorer.patterns(opener, candidates)[0]
+    wordLen = scorer.guessIndex.codes.shape[1]
+    second = {}
+    for pattern in np.unique(patterns):
+        remaining = candidates[patterns == pattern]
+        second[patternToStr(int(pattern), wordLen)] = scorer.rank(remaining, strategy,
+                                                                  limit=BOOK_WORDS)
+    guesses, answers = keyWords or (scorer.guessIndex.words, scorer.answerIndex.words)
+    key = bookKey(guesses, answers, strategy, scorer.usePriors)
+    return OpeningBook(key, first, second)
+
+
+def saveBook(book: OpeningBook, strategy: str, wordLen: int = 5,
+             usePriors: bool = False) -> str:
+    fileName = bookFile(strategy, wordLen, usePriors)
+    with open(fileName, 'w') as outFD:
+        json.dump({'key': book.key, 'first': book.first, 'second': book.second}, outFD, indent=1)
+    return fileName
+
+
+def loadBook(guesses: list[str], answers: list[str], strategy: str,
+             usePriors: bool = False) -> OpeningBook | None:
+    fileName = bookFile(strategy, len(answers[0]) if answers else 5, usePriors)
+    if not exists(fileName):
+        return None
+    with open(fileName) as inFD:
+        data = json.load(inFD)
+    if data.get('key') != bookKey(guesses, answers, strategy, usePriors):
+        print(f'The opening book {fileName} is for other word lists, rerun '
+              f'"wordle --strategy {strategy} build-book"', file=sys.stderr)
+        return None
+    return OpeningBook(data['key'], data['first'], data['second'])
@@ -0,0 +1,93 @@
+# Memo cache for solver results keyed by board state. The same opener with the same
+# feedback comes up again and again across games, so candidate sets and ranked guesses are
+# kept in a size limited LRU, optionally saved as JSON between runs. A saved cache is keyed
+# by a hash of the word lists, so a changed list never reads stale candidate indexes.
+#
+# Keys are tuples whose first item names the kind of result, e.g. ("candidates", ...), and
+# hits and misses are counted per kind. The server's executor threads share one cache, so
+# lookups and updates hold a lock.
+
+import sys
+import json
+import threading
+from collections import OrderedDict
+from os.path import exists
+from typing import Any
+
+import numpy as np
+
+from instrument import instruments
+
+CACHE_SIZE = 4096  # Default entry limit, plenty for every second and third row of a bench
+
+
+def _toTuple(value: Any) -> Any:
+    '''JSON lists back to the nested tuples used as keys'''
+    return tuple(_toTuple(x) for x in value) if isinstance(value, list) else value
+
+
+class BoardCache:
+    def __init__(self, key: str, maxSize: int = CACHE_SIZE, fileName: str | None = None) -> None:
+        self.key = key
+        self.maxSize = maxSize
+        self.fileName = fileName
+        self.entries: OrderedDict[tuple, Any] = OrderedDict()
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if fileName is not None:
+            self.load()
+
+    def get(self, key: tuple) -> Any:
+        '''The cached value, or None on a miss'''
+        with self.lock:
+            value = self.entries.get(key)
+            counts = self.misses if value is None else self.hits
+            counts[key[0]] = counts.get(key[0], 0) + 1
+            if value is not None:
+                self.entries.move_to_end(key)
+        instruments.count(f'cache.{key[0]}.{"misses" if value is None else "hits"}')
+        return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self) -> None:
+        '''Read the entries saved for the same word lists, silently starting empty otherwise'''
+        if self.fileName is None or not exists(self.fileName):
+            return
+        with open(self.fileName) as inFD:
+            saved = json.load(inFD)
+        if saved.get('key') != self.key:
+            print(f'Ignoring the board cache in {self.fileName}, it was saved for other word lists',
+                  file=sys.stderr)
+            return
+        for key, value in saved['entries'][-self.maxSize:]:
+            key = _toTuple(key)
+            self.entries[key] = np.array(value, dtype=np.intp) if key[0] == 'candidates' else value
+
+    def save(self) -> None:
+        if self.fileName is None:
+            return
+        entries = [[key, value.tolist() if isinstance(value, np.ndarray) else value]
+                   for key, value in self.entries.items()]
+        with open(self.fileName, 'w') as outFD:
+            json.dump({'key': self.key, 'entries': entries}, outFD, separators=(',', ':'))
+
+    def stats(self) -> str:
+        parts = []
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            parts.append(f'{kind} {hits} hits / {misses} misses '
+                         f'({100 * hits / max(1, hits + misses):.1f}%)')
+        return (f'Cache: {", ".join(parts) or "unused"}; {len(self)} of {self.maxSize} entries, '
+                f'{self.evictions} evictions')
@@ -0,0 +1,94 @@
+# Board constraints as per-position allowed-letter bitmasks plus min/max letter counts.
+#
+# Bit n of a position mask is set when letter chr(ord('a') + n) may still appear there.
+# Constraints only ever tighten as rows are added, so the candidates left after one row
+# can be narrowed by the next row without rescanning the whole word list.
+
+import numpy as np
+
+from words import WordIndex
+from patterns import GREEN, YELLOW, unpackPattern
+
+ALL_LETTERS = (1 << 26) - 1
+
+
+def letterBit(letter: str) -> int:
+    return 1 << (ord(letter) - ord('a'))
+
+
+class Constraints:
+    def __init__(self, wordLen: int = 5) -> None:
+        self.wordLen = wordLen
+        self.allowed = [ALL_LETTERS] * wordLen
+        self.green = [ALL_LETTERS] * wordLen
+        self.minCount = np.zeros(26, dtype=np.uint8)
+        self.maxCount = np.full(26, wordLen, dtype=np.uint8)
+
+    def addPattern(self, guess: str, pattern: int) -> None:
+        '''Tighten the constraints with a guess and its packed feedback pattern'''
+        lineCount: dict[str, int] = {}
+        capped: set[str] = set()
+        for col, (letter, digit) in enumerate(zip(guess, unpackPattern(pattern, len(guess)))):
+            bit = letterBit(letter)
+            if digit == GREEN:
+                self.allowed[col] = bit
+                self.green[col] = bit
+            else:
+                self.allowed[col] &= ~bit
+            if digit in [GREEN, YELLOW]:
+                lineCount[letter] = lineCount.get(letter, 0) + 1
+            else:
+                lineCount.setdefault(letter, 0)
+                capped.add(letter)
+        for letter, count in lineCount.items():
+            code = ord(letter) - ord('a')
+            if count > self.minCount[code]:
+                self.minCount[code] = count
+            if letter in capped:
+                self.maxCount[code] = min(self.maxCount[code], count)
+
+    def hints(self) -> 'Constraints':
+        '''
+        Only the revealed hints, which hard mode makes every guess use: green letters stay
+        in place and yellow letters appear somewhere, but grey letters may be reused
+        '''
+        hints = Constraints(self.wordLen)
+        hints.allowed = list(self.green)
+        hints.green = list(self.green)
+        hints.minCount = self.minCount.copy()
+        return hints
+
+    def filter(self, index: WordIndex, candidates: np.ndarray | None = None) -> np.ndarray:
+        '''
+        Return the indices into index (restricted to candidates when given) of the words
+        that satisfy every constraint. The letter masks drop words missing a known letter or
+        holding an excluded one before the per-position and count checks.
+        '''
+        if candidates is None:
+            candidates = np.arange(len(index))
+        required = sum(1 << int(code) for code in np.flatnonzero(self.minCount))
+        excluded = sum(1 << int(code) for code in np.flatnonzero(self.maxCount == 0))
+        if required or excluded:
+            masks = index.masks[candidates]
+            candidates = candidates[((masks & required) == required) & ((masks & excluded) == 0)]
+        codes = index.codes[candidates]
+        keep = np.ones(len(candidates), dtype=bool)
+        for col, allowed in enumerate(self.allowed):
+            if allowed != ALL_LETTERS:
+                keep &= ((allowed >> codes[:, col].astype(np.int64)) & 1).astype(bool)
+        letters = np.flatnonzero((self.minCount > 0) | (self.maxCount < self.wordLen))
+        if len(letters):
+            counts = index.counts[candidates][:, letters]
+            keep &= (counts >= self.minCount[letters]).all(axis=1)
+            keep &= (counts <= self.maxCount[letters]).all(axis=1)
+        return candidates[keep]
+
+    def __str__(self) -> str:
+        positions = []
+        for allowed in self.allowed:
+            letters = ''.join(chr(ord('a') + i) for i in range(26) if allowed >> i & 1)
+            positions.append('.' if allowed == ALL_LETTERS else f'[{letters}]')
+        counts = []
+        for code in np.flatnonzero((self.minCount > 0) | (self.maxCount < self.wordLen)):
+            counts.append(f'{chr(ord("a") + code)}:{self.minCount[code]}-{self.maxCount[code]}')
+        return f'positions: {"".join(positions)} counts: {" ".join(counts)}'
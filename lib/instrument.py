@@ -0,0 +1,68 @@
+# Hot path instrumentation: timers and counters that are written out as one JSON line
+# per committed row with --stats-file. Everything is a no-op until enable() is called, so
+# the solver pays a single attribute check per timed call when it is off.
+
+import json
+import time
+from functools import wraps
+from typing import Any, Callable, TextIO
+
+
+class Instruments:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.outFD: TextIO | None = None
+        self.reset()
+
+    def enable(self, fileName: str) -> None:
+        self.outFD = open(fileName, 'a')
+        self.enabled = True
+
+    def close(self) -> None:
+        if self.outFD is not None:
+            self.outFD.close()
+        self.outFD = None
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.timers: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+
+    def addTime(self, name: str, seconds: float) -> None:
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, increment: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + increment
+
+    def emitRow(self, **fields: Any) -> None:
+        '''Write the timers and counters gathered since the last row, then start afresh'''
+        if not self.enabled or self.outFD is None:
+            return
+        record = dict(fields)
+        record['ms'] = {name: round(1000 * seconds, 3) for name, seconds in self.timers.items()}
+        record['calls'] = self.calls
+        record['counters'] = self.counters
+        print(json.dumps(record), file=self.outFD, flush=True)
+        self.reset()
+
+
+instruments = Instruments()
+
+
+def timed(name: str) -> Callable:
+    '''Decorator that adds the run time of each call to the named timer'''
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instruments.addTime(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
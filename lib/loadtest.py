@@ -0,0 +1,79 @@
+# Load test client for `wordle serve`: sends random boards to /solve from a number of
+# concurrent keep-alive connections and reports requests per second and latency percentiles.
+
+import json
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+from patterns import scorePattern, patternToStr
+from bench import percentile
+
+
+def makeBoards(answers: list[str], guesses: list[str], count: int,
+               seed: int = 0) -> list[list[list[str]]]:
+    '''count boards of one to three random guesses against a random answer'''
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        secret = rng.choice(answers)
+        rows = []
+        for guess in rng.sample(guesses, rng.randint(1, 3)):
+            rows.append([guess, patternToStr(scorePattern(guess, secret), len(secret))])
+        boards.append(rows)
+    return boards
+
+
+async def postJSON(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                   host: str, path: str, body: dict) -> tuple[int, dict]:
+    payload = json.dumps(body).encode()
+    writer.write(f'POST {path} HTTP/1.1\r\nHost: {host}\r\n'
+                 f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+                 '\r\n'.encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in [b'\r\n', b'\n', b'']:
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def loadTest(url: str, boards: list, concurrency: int) -> tuple[list[float], int, float]:
+    '''Returns the request latencies, the number of failed requests and the wall time'''
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(boards)
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for rows in pending:
+                start = time.perf_counter()
+                status, _ = await postJSON(reader, writer, host, '/solve', {'rows': rows})
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - start
+
+
+def loadTestReport(latencies: list[float], errors: int, wallTime: float) -> str:
+    ms = [1000 * x for x in latencies]
+    return '\n'.join([
+        f'Requests: {len(ms)}, errors: {errors}, wall time {wallTime:.2f}s',
+        f'Throughput: {len(ms) / wallTime:.1f} requests/s',
+        f'Latency: p50 {percentile(ms, 0.5):.2f}ms, p90 {percentile(ms, 0.9):.2f}ms, '
+        f'p99 {percentile(ms, 0.99):.2f}ms, max {max(ms, default=0):.2f}ms'])
@@ -0,0 +1,160 @@
+# Multi-board play (Quordle, Octordle): every guess is scored against all the boards at once.
+#
+# Each board keeps its own candidates, narrowed by its own feedback. To rank guesses the
+# unsolved boards' candidates are merged, the patterns of each block of guesses are
+# computed once over that union, and each board's histogram is taken from its columns.
+# A guess scores the sum of its per-board scores, which for entropy is the combined
+# information since the boards' answers are independent.
+
+import random
+from collections import Counter
+
+import numpy as np
+
+from boardsolver import BoardSolver, BoardState
+from patterns import patternFromStr, scorePattern, allGreen
+from strategy import (GuessScorer, patternHistograms, scoreHistograms, PRUNE_SAMPLE,
+                      PRUNE_KEEP)
+from instrument import timed
+
+BOARDS = 4  # Quordle, Octordle is 8
+
+
+def maxRows(boards: int) -> int:
+    '''Rows allowed: 9 for Quordle, 13 for Octordle'''
+    return boards + 5
+
+
+class MultiBoard:
+    '''The boards of one game, each narrowed by its own feedback to the shared guesses'''
+    def __init__(self, solver: BoardSolver, boards: int = BOARDS) -> None:
+        self.solver = solver
+        self.boards = [solver.board() for _ in range(boards)]
+        self.guesses: list[str] = []
+
+    def addGuess(self, guess: str, patterns: list[int]) -> None:
+        '''patterns has one entry per unsolved board, in board order'''
+        unsolved = self.unsolved()
+        if len(patterns) != len(unsolved):
+            raise ValueError(f'Expected {len(unsolved)} patterns, one per unsolved board')
+        self.guesses.append(guess)
+        for board, pattern in zip(unsolved, patterns):
+            board.addRow(guess, pattern)
+
+    def unsolved(self) -> list[BoardState]:
+        return [board for board in self.boards if not board.solved]
+
+    @property
+    def solved(self) -> bool:
+        return not self.unsolved()
+
+
+class MultiBoardSolver:
+    def __init__(self, solver: BoardSolver) -> None:
+        self.solver = solver
+        self.scorer: GuessScorer = solver.scorer
+        self.firstGuesses: dict[tuple[int, int], list[str]] = {}  # By (boards, limit)
+
+    def game(self, boards: int = BOARDS) -> MultiBoard:
+        return MultiBoard(self.solver, boards)
+
+    def scoreBoards(self, guesses: np.ndarray, candidateSets: list[np.ndarray]) -> np.ndarray:
+        '''Summed scores of guesses over the boards, each pattern computed once'''
+        union, inverse = np.unique(np.concatenate(candidateSets), return_inverse=True)
+        columns = np.split(inverse, np.cumsum([len(c) for c in candidateSets])[:-1])
+        scores = np.zeros(len(guesses))
+        block = self.scorer.scoreBlock
+        for start in range(0, len(guesses), block):
+            patterns = self.scorer.patterns(guesses[start:start + block], union)
+            for cols in columns:
+                histograms = patternHistograms(patterns[:, cols], self.scorer.numPatterns)
+                scores[start:start + block] += scoreHistograms(histograms, self.solver.strategy)
+        return scores
+
+    @timed('multiRank')
+    def rank(self, game: MultiBoard, limit: int = 10) -> list[str]:
+        '''
+        Guesses best first. Boards down to one or two candidates are finished off first,
+        otherwise guesses are scored with the same two pass pruning as GuessScorer.rank.
+        '''
+        unsolved = game.unsolved()
+        if not unsolved:
+            return []
+        candidateSets = [board.candidateIndexes() for board in unsolved]
+        if any(len(c) == 0 for c in candidateSets):
+            return []
+        answerIndex = self.scorer.answerIndex
+        finishing = [answerIndex.words[c[0]] for c in candidateSets if len(c) <= 2]
+        if finishing:
+            return list(dict.fromkeys(finishing))[:limit]
+        if not game.guesses and (len(unsolved), limit) in self.firstGuesses:
+            return self.firstGuesses[len(unsolved), limit]
+        guesses = np.arange(len(self.scorer.guessIndex))
+        if sum(len(c) for c in candidateSets) > PRUNE_SAMPLE and len(guesses) > PRUNE_KEEP:
+            perBoard = max(1, PRUNE_SAMPLE // len(candidateSets))
+            samples = [c[np.linspace(0, len(c) - 1, min(perBoard, len(c))).astype(np.int64)]
+                       for c in candidateSets]
+            rough = self.scoreBoards(guesses, samples)
+            guesses = guesses[np.argsort(-rough, kind='stable')[:PRUNE_KEEP]]
+        scores = self.scoreBoards(guesses, candidateSets)
+        isCandidate = np.zeros(len(self.scorer.guessIndex), dtype=bool)
+        candidateGuesses = self.scorer.guessOfAnswer[np.concatenate(candidateSets)]
+        isCandidate[candidateGuesses[candidateGuesses >= 0]] = True
+        order = np.lexsort((guesses, ~isCandidate[guesses], -scores))
+        ranked = self.scorer.guessIndex.select(guesses[order[:limit]])
+        if not game.guesses:
+            self.firstGuesses[len(unsolved), limit] = ranked
+        return ranked
+
+
+def parseGuessLine(line: str, wordLen: int) -> tuple[str, list[int]]:
+    '''"guess PATTERN PATTERN ..." with a pattern for each unsolved board'''
+    parts = line.split()
+    if len(parts) < 2 or len(parts[0]) != wordLen or not parts[0].isalpha():
+        raise ValueError(f'Expected a {wordLen} letter guess followed by its patterns')
+    patterns = []
+    for part in parts[1:]:
+        part = part.replace('\ufe0f', '')  # Emoji variation selectors
+        if len(part) != wordLen:
+            raise ValueError(f'Bad pattern {part!r}, expected {wordLen} of G, Y and B')
+        patterns.append(patternFromStr(part))
+    return parts[0].lower(), patterns
+
+
+def playMulti(multiSolver: MultiBoardSolver, secrets: list[str]) -> list[str]:
+    '''Play one game headless against secrets, returning the guesses made'''
+    game = multiSolver.game(len(secrets))
+    wordLen = len(secrets[0])
+    remaining = list(secrets)
+    while remaining and len(game.guesses) < 2 * maxRows(len(secrets)):
+        guess = multiSolver.rank(game, 1)[0]
+        game.addGuess(guess, [scorePattern(guess, secret) for secret in remaining])
+        remaining = [s for s in remaining if scorePattern(guess, s) != allGreen(wordLen)]
+    return game.guesses
+
+
+def simulateMulti(multiSolver: MultiBoardSolver, boards: int, games: int,
+                  seed: int = 0) -> str:
+    '''Play random games and report the guess counts'''
+    rng = random.Random(seed)
+    answers = multiSolver.scorer.answerIndex.words
+    counts = [len(playMulti(multiSolver, rng.sample(answers, boards))) for _ in range(games)]
+    distribution = Counter(counts)
+    failures = sum(n > maxRows(boards) for n in counts)
+    return '\n'.join([
+        f'Games: {games} of {boards} boards',
+        'Guesses: ' + ', '.join(f'{n}: {distribution[n]}' for n in sorted(distribution)),
+        f'Mean guesses: {sum(counts) / max(1, games):.3f}',
+        f'Failures (> {maxRows(boards)} rows): {failures}'])
+
+
+def describeBoards(game: MultiBoard, shown: int = 5) -> str:
+    lines = []
+    for i, board in enumerate(game.boards, 1):
+        if board.solved:
+            lines.append(f'Board {i}: solved')
+            continue
+        words = board.words()
+        more = f' (+{len(words) - shown})' if len(words) > shown else ''
+        lines.append(f'Board {i}: {len(words)} left: {" ".join(words[:shown])}{more}')
+    return '\n'.join(lines)
@@ -0,0 +1,43 @@
+# Process pools for the embarrassingly parallel jobs: whole-dictionary benchmarks and
+# scoring every allowed guess.
+#
+# Pools are always forked so the workers inherit the parent's word indexes copy-on-write
+# and share the memory-mapped pattern table through the page cache. Nothing large is
+# pickled, only the chunks of work and their results.
+
+import multiprocessing
+import multiprocessing.pool
+from typing import Any, Sequence
+
+import numpy as np
+
+_shared: dict[str, Any] = {}
+
+
+def _setShared(shared: dict[str, Any]) -> None:
+    _shared.update(shared)
+
+
+def inWorker() -> bool:
+    '''True inside a forkPool worker, where starting another pool is not allowed'''
+    return bool(_shared)
+
+
+def shared(name: str) -> Any:
+    '''Object handed to the pool by forkPool, looked up inside a worker'''
+    return _shared[name]
+
+
+def forkPool(workers: int, **sharedObjects: Any) -> multiprocessing.pool.Pool:
+    '''A pool whose workers can reach sharedObjects through shared() without pickling'''
+    context = multiprocessing.get_context('fork')
+    return context.Pool(workers, initializer=_setShared, initargs=(sharedObjects,))
+
+
+def splitWork(items: Sequence | np.ndarray, workers: int) -> list:
+    '''Split items into one contiguous chunk per worker, keeping their order'''
+    if isinstance(items, np.ndarray):
+        return [x for x in np.array_split(items, workers) if len(x)]
+    size = -(-len(items) // workers)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
@@ -0,0 +1,159 @@
+# Feedback patterns for every guess x answer pair, packed as base-3 integers.
+#
+# Each tile is one base-3 digit (0 = black, 1 = yellow, 2 = green) and the tile in
+# column i is weighted by 3**i, so a five letter pattern fits in a uint8 (max 242).
+# The full allowed-guesses x answer-words table is built once with numpy, saved
+# next to the word files and memory-mapped on load.
+
+import sys
+import hashlib
+from os.path import join as pjoin, exists
+
+import numpy as np
+
+from utils import ALL_WRONG, WRONG_PLACE, RIGHT_PLACE
+from words import ROOT_DIR, encodeWords
+
+BLACK = 0
+YELLOW = 1
+GREEN = 2
+
+WORDS_DIR = pjoin(ROOT_DIR, 'wordle-words')
+PATTERN_CHARS = {BLACK: 'B', YELLOW: 'Y', GREEN: 'G'}
+# Letters plus the squares of shared emoji grids, including the high contrast colours
+PATTERN_LOOKUP = {'B': BLACK, 'Y': YELLOW, 'G': GREEN,
+                  '\u2b1b': BLACK, '\u2b1c': BLACK, '\U0001f7e8': YELLOW, '\U0001f7e9': GREEN,
+                  '\U0001f7e6': YELLOW, '\U0001f7e7': GREEN}
+KEY_TYPE_DIGITS = {ALL_WRONG: BLACK, WRONG_PLACE: YELLOW, RIGHT_PLACE: GREEN}
+BUILD_CHUNK = 512  # Guesses scored per numpy pass while building the table
+
+
+def allGreen(wordLen: int = 5) -> int:
+    return 3 ** wordLen - 1
+
+
+def packPattern(digits: list[int]) -> int:
+    pattern = 0
+    for i, digit in enumerate(digits):
+        pattern += digit * 3 ** i
+    return pattern
+
+
+def unpackPattern(pattern: int, wordLen: int = 5) -> list[int]:
+    digits = []
+    for _ in range(wordLen):
+        pattern, digit = divmod(pattern, 3)
+        digits.append(digit)
+    return digits
+
+
+def patternFromStr(patternStr: str) -> int:
+    '''Convert a string such as "GYBBB", or a row of a shared emoji grid, into a packed pattern'''
+    try:
+        return packPattern([PATTERN_LOOKUP[ch] for ch in patternStr.upper()])
+    except KeyError:
+        raise ValueError(f'Bad pattern "{patternStr}", expected only G, Y and B '
+                         'or emoji squares') from None
+
+
+def patternToStr(pattern: int, wordLen: int = 5) -> str:
+    return ''.join(PATTERN_CHARS[x] for x in unpackPattern(pattern, wordLen))
+
+
+def patternFromLine(line) -> int:
+    '''Convert a WordleLine (list of KeyStrokes) into a packed pattern'''
+    return packPattern([KEY_TYPE_DIGITS[key.keyType] for key in line])
+
+
+def scorePattern(guess: str, answer: str) -> int:
+    '''Pure python scoring of a single pair, mirrors Wordle.makeGYB'''
+    digits = [BLACK] * len(guess)
+    remaining: dict[str, int] = {}
+    for col, (g, a) in enumerate(zip(guess, answer)):
+        if g == a:
+            digits[col] = GREEN
+        else:
+            remaining[a] = remaining.get(a, 0) + 1
+    for col, g in enumerate(guess):
+        if digits[col] != GREEN and remaining.get(g, 0) > 0:
+            digits[col] = YELLOW
+            remaining[g] -= 1
+    return packPattern(digits)
+
+
+def scorePatterns(guessCodes: np.ndarray, answerCodes: np.ndarray) -> np.ndarray:
+    '''
+    Vectorised scoring of every guess against every answer.
+
+    guessCodes and answerCodes are (n, wordLen) letter code arrays from words.encodeWords.
+    Returns a (len(guessCodes), len(answerCodes)) array of packed patterns.
+
+    A non green guess letter is yellow when the answer has more unmatched copies of that
+    letter than there are earlier non green copies of it in the guess, which is the same
+    left to right rule that makeGYB uses.
+    '''
+    wordLen = guessCodes.shape[1]
+    g = guessCodes[:, None, :]
+    a = answerCodes[None, :, :]
+    green = g == a
+    notGreen = ~green
+    dtype = np.uint8 if wordLen <= 5 else np.uint16
+    result = np.zeros((guessCodes.shape[0], answerCodes.shape[0]), dtype=dtype)
+    for i in range(wordLen):
+        gi = g[:, :, i:i + 1]
+        available = ((a == gi) & notGreen).sum(axis=2)
+        if i > 0:
+            earlier = ((g[:, :, :i] == gi) & notGreen[:, :, :i]).sum(axis=2)
+        else:
+            earlier = 0
+        yellow = notGreen[:, :, i] & (available > earlier)
+        digit = green[:, :, i] * GREEN + yellow * YELLOW
+        result += (digit * 3 ** i).astype(dtype)
+    return result
+
+
+def wordListsHash(guesses: list[str], answers: list[str]) -> str:
+    sha = hashlib.sha1()
+    sha.update('\n'.join(guesses).encode())
+    sha.update(b'\0')
+    sha.update('\n'.join(answers).encode())
+    return sha.hexdigest()[:16]
+
+
+class PatternTable:
+    '''
+    Lookup table of packed patterns, rows are guesses and columns are answers
+    '''
+    def __init__(self, guesses: list[str], answers: list[str], table: np.ndarray) -> None:
+        self.guesses = list(guesses)
+        self.answers = list(answers)
+        self.table = table
+        self.guessIndex = {w: i for i, w in enumerate(guesses)}
+        self.answerIndex = {w: i for i, w in enumerate(answers)}
+
+
+def patternTableFile(guesses: list[str], answers: list[str]) -> str:
+    return pjoin(WORDS_DIR, f'patterns.{wordListsHash(guesses, answers)}.npy')
+
+
+def buildPatternTable(guesses: list[str], answers: list[str]) -> np.ndarray:
+    guessCodes = encodeWords(guesses)
+    answerCodes = encodeWords(answers)
+    table = np.empty((len(guesses), len(answers)),
+                     dtype=np.uint8 if guessCodes.shape[1] <= 5 else np.uint16)
+    for start in range(0, len(guesses), BUILD_CHUNK):
+        end = start + BUILD_CHUNK
+        table[start:end] = scorePatterns(guessCodes[start:end], answerCodes)
+    return table
+
+
+def loadPatternTable(guesses: list[str], answers: list[str]) -> PatternTable:
+    '''
+    Memory-map the saved table for these word lists, building and saving it first if needed.
+    The file name carries a hash of both lists so a changed list never reads a stale table.
+    '''
+    fileName = patternTableFile(guesses, answers)
+    if not exists(fileName):
+        print(f'Building pattern table {fileName}', file=sys.stderr)
+        np.save(fileName, buildPatternTable(guesses, answers))
+    return PatternTable(guesses, answers, np.load(fileName, mmap_mode='r'))
@@ -0,0 +1,160 @@
+# Long running solver service: a small HTTP/JSON API on asyncio that loads the word lists
+# and indexes once and keeps per-session board state.
+#
+#   GET    /health                  {"ok": true, "sessions": n}
+#   POST   /solve                   {"rows": [["tarse", "YYBBB"], ...], "limit": 10}
+#   POST   /sessions                {"rows": [...]} (optional), returns {"session": id, ...}
+#   POST   /sessions/<id>/rows      {"rows": [...]} appended to the session's board
+#   GET    /sessions/<id>           the session's current answer
+#   DELETE /sessions/<id>
+#
+# Answers are {"rows": n, "candidates": count, "words": [first 20], "guesses": [...]}.
+# Scoring runs in a thread pool so slow boards do not hold up the event loop, and each
+# session has a lock so its rows are applied in order.
+
+import json
+import time
+import uuid
+import asyncio
+from typing import Any
+
+from boardsolver import BoardSolver, BoardState, parseRows
+
+MAX_BODY = 1 << 20        # Largest request body accepted
+SESSION_TTL = 3600        # Seconds before an idle session is dropped
+WORDS_SHOWN = 20          # Candidate words returned, matches printWords
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    def __init__(self, board: BoardState) -> None:
+        self.board = board
+        self.lock = asyncio.Lock()
+        self.used = time.monotonic()
+
+
+class SolverServer:
+    def __init__(self, solver: BoardSolver) -> None:
+        self.solver = solver
+        self.sessions: dict[str, Session] = {}
+
+    def answer(self, board: BoardState, limit: int) -> dict[str, Any]:
+        words = board.words()
+        return {'rows': len(board.rows), 'candidates': len(words), 'words': words[:WORDS_SHOWN],
+                'guesses': board.guesses(limit), 'solved': board.solved}
+
+    def expireSessions(self) -> None:
+        cutoff = time.monotonic() - SESSION_TTL
+        for sessionId in [k for k, v in self.sessions.items() if v.used < cutoff]:
+            del self.sessions[sessionId]
+
+    def getSession(self, sessionId: str) -> Session:
+        try:
+            session = self.sessions[sessionId]
+        except KeyError:
+            raise HttpError(404, f'No session {sessionId}') from None
+        session.used = time.monotonic()
+        return session
+
+    async def run(self, func, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def route(self, method: str, path: str, body: dict) -> dict[str, Any]:
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        limit = body.get('limit', 10)
+        if not isinstance(limit, int) or limit <= 0:
+            raise HttpError(400, 'limit must be a positive integer')
+        try:
+            rows = parseRows(body.get('rows', []), self.solver.wordLen)
+        except ValueError as e:
+            raise HttpError(400, str(e)) from None
+        if parts == ['health'] and method == 'GET':
+            return {'ok': True, 'sessions': len(self.sessions)}
+        if parts == ['solve'] and method == 'POST':
+            return await self.run(lambda: self.answer(self.solver.board(rows), limit))
+        if parts == ['sessions'] and method == 'POST':
+            self.expireSessions()
+            sessionId = uuid.uuid4().hex
+            session = Session(await self.run(self.solver.board, rows))
+            self.sessions[sessionId] = session
+            result = await self.run(self.answer, session.board, limit)
+            return {'session': sessionId, **result}
+        if len(parts) in [2, 3] and parts[0] == 'sessions':
+            session = self.getSession(parts[1])
+            if len(parts) == 2 and method == 'DELETE':
+                del self.sessions[parts[1]]
+                return {'deleted': parts[1]}
+            if len(parts) == 2 and method == 'GET':
+                async with session.lock:
+                    return await self.run(self.answer, session.board, limit)
+            if len(parts) == 3 and parts[2] == 'rows' and method == 'POST':
+                async with session.lock:
+                    def addRows():
+                        for guess, pattern in rows:
+                            session.board.addRow(guess, pattern)
+                        return self.answer(session.board, limit)
+                    return await self.run(addRows)
+            raise HttpError(405, f'{method} not allowed on {path}')
+        raise HttpError(404, f'Nothing at {path}')
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                try:
+                    method, path, _ = requestLine.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in [b'\r\n', b'\n', b'']:
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keepAlive = headers.get('connection', '').lower() != 'close'
+                status, result = 200, {}
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY:
+                        raise HttpError(413, f'Body over {MAX_BODY} bytes')
+                    body = json.loads(await reader.readexactly(length)) if length else {}
+                    if not isinstance(body, dict):
+                        raise HttpError(400, 'Expected a JSON object')
+                    result = await self.route(method, path, body)
+                except HttpError as e:
+                    status, result = e.status, {'error': str(e)}
+                except ValueError as e:  # Bad JSON or content-length
+                    status, result = 400, {'error': str(e)}
+                except Exception as e:
+                    status, result = 500, {'error': repr(e)}
+                payload = json.dumps(result).encode()
+                writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                             'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(payload)}\r\n'
+                             f'Connection: {"keep-alive" if keepAlive else "close"}\r\n'
+                             '\r\n'.encode() + payload)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(solver: BoardSolver, host: str, port: int) -> None:
+    server = SolverServer(solver)
+    tcpServer = await asyncio.start_server(server.handle, host, port)
+    print(f'Serving on http://{host}:{port}', flush=True)
+    async with tcpServer:
+        await tcpServer.serve_forever()
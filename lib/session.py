@@ -0,0 +1,177 @@
+# Append-only log of interactive sessions, one JSON object per line:
+#
+#   {"session": "...", "started": "2026-10-18T09:30:00Z", "settings": {...}, "words": "<hash>"}
+#   {"session": "...", "row": 1, "guess": "tarse", "pattern": "YYBBB", "candidates": 29, "ms": 3.1}
+#   {"session": "...", "end": "solved", "guess": "cloud"}
+#
+# Only committed rows are logged, each as soon as its suggestions are shown, so an
+# interrupted game loses nothing. A session without an "end" line is the one --resume picks
+# up: its rows are committed again one at a time and only the last is ranked. The same log
+# drives `wordle replay`, which plays real sessions again headless to reproduce slow rows,
+# and `wordle replay --boards`, which turns them into the board states `wordle stream` reads.
+
+import os
+import json
+import time
+from os.path import join as pjoin, exists
+from typing import Any, Iterator
+
+from board import Row
+from patterns import patternFromStr, patternToStr
+from utils import ScriptError
+from words import ROOT_DIR
+from bench import percentile
+
+SESSION_FILE = pjoin(ROOT_DIR, 'wordle-words', 'session.jsonl')
+SOLVED = 'solved'
+GAVE_UP = 'gave up'
+SLOWEST = 5  # Slowest rows listed by the replay report
+
+
+class Session:
+    '''One session read back from the log'''
+    def __init__(self, sessionId: str, settings: dict[str, Any], words: str | None) -> None:
+        self.id = sessionId
+        self.settings = settings
+        self.words = words                  # Hash of the word lists it was played with
+        self.rows: list[Row] = []
+        self.candidates: list[int] = []     # Candidates left after each row
+        self.rowTimes: list[float] = []     # Seconds each row took when it was played
+        self.end: str | None = None
+        self.solvedGuess: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    def boards(self) -> Iterator[dict]:
+        '''Stream records: the board before each guess, with the guess made on it as "next"'''
+        guesses = [row.word for row in self.rows]
+        if self.solvedGuess is not None:
+            guesses.append(self.solvedGuess)
+        for i, guess in enumerate(guesses):
+            yield {'id': f'{self.id}/{i + 1}',
+                   'rows': [[row.word, patternToStr(row.pattern, len(row.word))]
+                            for row in self.rows[:i]],
+                   'next': guess}
+
+
+class SessionLog:
+    '''Appends one session's committed rows to the log, continuing session if given'''
+    def __init__(self, fileName: str, settings: dict[str, Any], words: str,
+                 session: Session | None = None) -> None:
+        self.fileName = fileName
+        self.settings = settings
+        self.words = words
+        if session is None:
+            self.id = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.urandom(3).hex()}'
+            self.rows = 0
+            self.started = False
+        else:
+            self.id = session.id
+            self.rows = len(session.rows)
+            self.started = True
+
+    def append(self, **fields: Any) -> None:
+        if not self.started:  # No header until there is a row, so idle starts leave no trace
+            self.started = True
+            self.append(started=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                        settings=self.settings, words=self.words)
+        with open(self.fileName, 'a') as outFD:
+            print(json.dumps({'session': self.id, **fields}), file=outFD)
+
+    def logRow(self, row: Row, candidates: int, seconds: float) -> None:
+        self.rows += 1
+        self.append(row=self.rows, guess=row.word,
+                    pattern=patternToStr(row.pattern, len(row.word)),
+                    candidates=candidates, ms=round(1000 * seconds, 3))
+
+    def logEnd(self, end: str, guess: str | None = None) -> None:
+        self.append(end=end, **({'guess': guess} if guess is not None else {}))
+
+
+def readSessions(fileName: str) -> list[Session]:
+    '''Every session in the log, in the order they were started'''
+    if not exists(fileName):
+        raise ScriptError(f'No session log {fileName}')
+    sessions: dict[str, Session] = {}
+    with open(fileName) as inFD:
+        lines = inFD.read().splitlines()
+    for lineNo, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            session = sessions.get(record['session'])
+            if session is None:
+                session = sessions[record['session']] = Session(
+                    record['session'], record.get('settings', {}), record.get('words'))
+            if 'row' in record:
+                session.rows.append(Row(record['guess'], patternFromStr(record['pattern'])))
+                session.candidates.append(record['candidates'])
+                session.rowTimes.append(record['ms'] / 1000)
+            elif 'end' in record:
+                session.end = record['end']
+                session.solvedGuess = record.get('guess')
+        except (ValueError, KeyError, TypeError) as e:
+            if lineNo == len(lines):  # Cut short by a crash mid-write
+                break
+            raise ScriptError(f'{fileName} line {lineNo}: bad session record ({e})')
+    return list(sessions.values())
+
+
+def lastSession(fileName: str) -> Session | None:
+    '''The most recent session in the log, None if there is no log'''
+    if not exists(fileName):
+        return None
+    sessions = readSessions(fileName)
+    return sessions[-1] if sessions else None
+
+
+class ReplayedRow:
+    def __init__(self, session: Session, row: int, seconds: float, candidates: int) -> None:
+        self.session = session
+        self.row = row              # Zero based
+        self.seconds = seconds
+        self.candidates = candidates
+
+    @property
+    def matches(self) -> bool:
+        '''Whether the replay left as many candidates as the session did'''
+        return self.candidates == self.session.candidates[self.row]
+
+
+def replaySession(wordle, session: Session) -> list[ReplayedRow]:
+    '''Commit the session's rows again with wordle, timing each as the event loop would'''
+    wordle.reset()
+    replayed = []
+    for i, row in enumerate(session.rows):
+        start = time.perf_counter()
+        result = wordle.replayRow(row)
+        seconds = time.perf_counter() - start
+        replayed.append(ReplayedRow(session, i, seconds, 0 if result is None else len(result[1])))
+        if result is None:
+            break
+        wordle.recordRow(result[1], session=session.id)
+    return replayed
+
+
+def replayReport(replayed: list[ReplayedRow], sessions: int, wallTime: float) -> str:
+    rowTimes = [r.seconds for r in replayed]
+    loggedTimes = [r.session.rowTimes[r.row] for r in replayed]
+    mismatches = [r for r in replayed if not r.matches]
+    lines = [f'Sessions: {sessions}, rows: {len(replayed)}']
+    for label, times in [('Row latency', rowTimes), ('Logged latency', loggedTimes)]:
+        if times:
+            lines.append(f'{label}: mean {1000 * sum(times) / len(times):.3f}ms, '
+                         f'p99 {1000 * percentile(times, 0.99):.3f}ms')
+    lines.append(f'Candidate mismatches: {len(mismatches)}'
+                 + (' (the word lists or used words have changed since)' if mismatches else ''))
+    slowest = sorted(replayed, key=lambda r: -r.seconds)[:SLOWEST]
+    if slowest:
+        lines.append('Slowest rows:')
+        lines += [f'  {r.session.id} row {r.row + 1} {r.session.rows[r.row].word}: '
+                  f'{1000 * r.seconds:.3f}ms (logged {1000 * r.session.rowTimes[r.row]:.3f}ms)'
+                  for r in slowest]
+    lines.append(f'Wall time: {wallTime:.2f}s')
+    return '\n'.join(lines)
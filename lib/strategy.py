@@ -0,0 +1,181 @@
+# Guess ranking by the feedback distribution each guess produces over the candidates.
+#
+# entropy: maximise the expected information (in bits) of the feedback.
+# minimax: minimise the largest group of candidates that a single feedback can leave.
+#
+# Patterns come from the precomputed PatternTable when every word is in it, otherwise
+# they are scored with numpy on the fly. Scoring is done in blocks of guesses sized so the
+# per-guess pattern histograms stay within SCORE_BYTES at every word length: 3**wordLen
+# patterns of 8 bytes per guess, about 2000 guesses a block at 5 letters but 80 at 8.
+
+import multiprocessing.pool
+
+import numpy as np
+
+from words import WordIndex
+from patterns import PatternTable, scorePatterns
+from parallel import forkPool, inWorker, shared, splitWork
+from instrument import instruments, timed
+
+HEURISTIC = 'heuristic'
+ENTROPY = 'entropy'
+MINIMAX = 'minimax'
+STRATEGIES = [HEURISTIC, ENTROPY, MINIMAX]
+
+SCORE_BYTES = 2**22     # Histogram bytes per numpy pass, 4MB
+PRUNE_SAMPLE = 256    # Candidates used for the first, approximate scoring pass
+PRUNE_KEEP = 256      # Guesses kept for exact scoring after the approximate pass
+PARALLEL_MIN = 4096   # Fewest guesses worth splitting across worker processes
+# With priors, entropy ranks by expected guesses: a guess wins outright with its prior
+# probability, otherwise the bits it leaves unknown cost about 1 + EXTRA_GUESSES * log2(1 + bits)
+# more guesses. The constant was tuned with `wordle worst-case` over the answer list, the same
+# list the bench plays, so priors stay opt in (--priors) until they show a held out gain.
+EXTRA_GUESSES = 0.7
+
+
+def patternHistograms(patterns: np.ndarray, numPatterns: int,
+                      weights: np.ndarray | None = None) -> np.ndarray:
+    '''
+    Count (or sum the weights of) the candidates per pattern for every guess.
+    patterns is (guesses, candidates), the result is (guesses, numPatterns).
+    '''
+    numGuesses = patterns.shape[0]
+    offsets = (np.arange(numGuesses, dtype=np.int64) * numPatterns)[:, None]
+    flat = (patterns.astype(np.int64) + offsets).ravel()
+    if weights is not None:
+        weights = np.broadcast_to(weights, patterns.shape).ravel()
+    return np.bincount(flat, weights=weights,
+                       minlength=numGuesses * numPatterns).reshape(numGuesses, numPatterns)
+
+
+def scoreHistograms(histograms: np.ndarray, strategy: str) -> np.ndarray:
+    '''Higher is better for every strategy'''
+    if strategy == ENTROPY:
+        total = histograms.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = np.where(histograms > 0, histograms / total, 0)
+            return -(p * np.log2(np.where(p > 0, p, 1))).sum(axis=1)
+    if strategy == MINIMAX:
+        return -histograms.max(axis=1).astype(np.float64)
+    raise ValueError(f'Unknown strategy "{strategy}"')
+
+
+def _scoreChunk(args) -> np.ndarray:
+    guesses, candidates, strategy, weights = args
+    return shared('scorer').scoreSerial(guesses, candidates, strategy, weights)
+
+
+class GuessScorer:
+    '''
+    Scores every word of guessIndex against a set of candidates from answerIndex. With
+    workers > 1 large guess sets are split across a pool of forked worker processes.
+    '''
+    def __init__(self, guessIndex: WordIndex, answerIndex: WordIndex,
+                 patternTable: PatternTable | None = None, workers: int = 1,
+                 usePriors: bool = False) -> None:
+        self.workers = workers
+        self.usePriors = usePriors
+        self.pool: multiprocessing.pool.Pool | None = None
+        self.guessIndex = guessIndex
+        self.answerIndex = answerIndex
+        self.patternTable = patternTable
+        self.numPatterns = 3 ** guessIndex.codes.shape[1]
+        self.scoreBlock = max(1, SCORE_BYTES // (8 * self.numPatterns))  # Guesses per pass
+        self.guessRows: np.ndarray | None = None
+        self.answerCols: np.ndarray | None = None
+        if patternTable is not None:
+            rows = np.array([patternTable.guessIndex.get(w, -1) for w in guessIndex.words])
+            cols = np.array([patternTable.answerIndex.get(w, -1) for w in answerIndex.words])
+            if (rows >= 0).all():
+                self.guessRows = rows
+                self.answerCols = cols
+        # Word positions of the guesses that could themselves be answers
+        self.guessOfAnswer = np.array([guessIndex.position.get(w, -1) for w in answerIndex.words])
+
+    def patterns(self, guesses: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        '''(len(guesses), len(candidates)) packed patterns'''
+        if self.answerCols is not None and (self.answerCols[candidates] >= 0).all():
+            cols = self.answerCols[candidates]
+            return self.patternTable.table[self.guessRows[guesses]][:, cols]  # type: ignore
+        return scorePatterns(self.guessIndex.codes[guesses], self.answerIndex.codes[candidates])
+
+    def score(self, guesses: np.ndarray, candidates: np.ndarray, strategy: str,
+              weights: np.ndarray | None = None) -> np.ndarray:
+        instruments.count('score.patterns', len(guesses) * len(candidates))
+        if self.workers > 1 and len(guesses) >= PARALLEL_MIN and not inWorker():
+            chunks = [(chunk, candidates, strategy, weights)
+                      for chunk in splitWork(guesses, self.workers)]
+            return np.concatenate(self.startPool().map(_scoreChunk, chunks))
+        return self.scoreSerial(guesses, candidates, strategy, weights)
+
+    def startPool(self) -> multiprocessing.pool.Pool:
+        '''The worker pool, forked now if it is not yet running, e.g. before any threads start'''
+        if self.pool is None:
+            self.pool = forkPool(self.workers, scorer=self)
+        return self.pool
+
+    def scoreSerial(self, guesses: np.ndarray, candidates: np.ndarray, strategy: str,
+                    weights: np.ndarray | None = None) -> np.ndarray:
+        scores = np.empty(len(guesses))
+        for start in range(0, len(guesses), self.scoreBlock):
+            block = guesses[start:start + self.scoreBlock]
+            histograms = patternHistograms(self.patterns(block, candidates),
+                                           self.numPatterns, weights)
+            scores[start:start + self.scoreBlock] = scoreHistograms(histograms, strategy)
+        return scores
+
+    def weights(self, candidates: np.ndarray, strategy: str) -> np.ndarray | None:
+        '''
+        The candidates' priors when entropy ranks by probability, None for uniform. Minimax
+        always counts candidates, so its worst case stays the largest group left.
+        '''
+        if not self.usePriors or strategy != ENTROPY:
+            return None
+        return self.answerIndex.priors[candidates].astype(np.float64)
+
+    def expectedGuesses(self, guesses: np.ndarray, candidates: np.ndarray, weights: np.ndarray,
+                        information: np.ndarray) -> np.ndarray:
+        '''Expected guesses to finish after each of guesses, from their expected information'''
+        p = weights / weights.sum()
+        uncertainty = -(p * np.log2(p)).sum()
+        chance = np.zeros(len(self.guessIndex))
+        candidateGuesses = self.guessOfAnswer[candidates]
+        chance[candidateGuesses[candidateGuesses >= 0]] = p[candidateGuesses >= 0]
+        left = np.maximum(uncertainty - information, 0)
+        return 1 + (1 - chance[guesses]) * (1 + EXTRA_GUESSES * np.log2(1 + left))
+
+    def rankScores(self, guesses: np.ndarray, candidates: np.ndarray,
+                   strategy: str) -> np.ndarray:
+        '''The scores rank orders guesses by, higher is better'''
+        weights = self.weights(candidates, strategy)
+        scores = self.score(guesses, candidates, strategy, weights)
+        if weights is not None and strategy == ENTROPY:
+            scores = -self.expectedGuesses(guesses, candidates, weights, scores)
+        return scores
+
+    @timed('rank')
+    def rank(self, candidates: np.ndarray, strategy: str, limit: int = 10,
+             guesses: np.ndarray | None = None) -> list[str]:
+        '''
+        Return up to limit guesses, best first. Ties go to guesses that could be the answer,
+        then to the more frequent word. With many candidates the guesses are first scored
+        against an evenly spaced sample of them and only the best PRUNE_KEEP are scored exactly.
+        With usePriors entropy weights the feedback by the candidates' priors and ranks by
+        expected guesses.
+        '''
+        if len(candidates) <= 2:
+            return self.answerIndex.select(candidates)
+        if guesses is None:
+            guesses = np.arange(len(self.guessIndex))
+        weights = self.weights(candidates, strategy)
+        if len(candidates) > PRUNE_SAMPLE and len(guesses) > PRUNE_KEEP:
+            sampled = np.linspace(0, len(candidates) - 1, PRUNE_SAMPLE).astype(np.int64)
+            rough = self.score(guesses, candidates[sampled], strategy,
+                               None if weights is None else weights[sampled])
+            guesses = guesses[np.argsort(-rough, kind='stable')[:PRUNE_KEEP]]
+        scores = self.rankScores(guesses, candidates, strategy)
+        isCandidate = np.zeros(len(self.guessIndex), dtype=bool)
+        candidateGuesses = self.guessOfAnswer[candidates]
+        isCandidate[candidateGuesses[candidateGuesses >= 0]] = True
+        order = np.lexsort((guesses, ~isCandidate[guesses], -scores))
+        return self.guessIndex.select(guesses[order[:limit]])
@@ -0,0 +1,91 @@
+# Streaming batch evaluation of board states, one JSON object per line in and out.
+#
+# In:  {"id": ..., "rows": [["tarse", "YYBBB"], ...], "next": "cloud"}
+#      id and next are optional, patterns may be "GYB" letters or emoji squares.
+# Out: {"id": ..., "candidates": 29, "top": [...], "next": "cloud", "optimal": false,
+#       "nextRank": 4}
+#
+# Records are read, evaluated and written a batch at a time so memory stays bounded
+# however long the input is, and batches can be split across forked worker processes.
+
+import json
+from itertools import islice
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from boardsolver import BoardSolver, parseRows
+from parallel import forkPool, shared, splitWork
+
+BATCH_SIZE = 256      # Records read per batch per worker
+RANKED = 10           # Guesses searched for the next guess's rank
+OPTIMAL_EPSILON = 1e-9
+
+
+def evaluateRecord(solver: BoardSolver, line: str, top: int) -> dict:
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError('Expected a JSON object')
+        board = solver.board(parseRows(record.get('rows', []), solver.wordLen))
+    except ValueError as e:
+        return {'error': str(e)}
+    candidates = len(board.candidateIndexes())
+    nextGuess = record.get('next')
+    if not isinstance(nextGuess, str) or board.solved or not candidates:
+        nextGuess = None  # Nothing to judge
+    ranked = board.guesses(top if nextGuess is None else max(top, RANKED))  # Ranked once for both
+    result: dict = {'candidates': candidates, 'top': ranked[:top]}
+    if 'id' in record:
+        result = {'id': record['id'], **result}
+    if nextGuess is not None:
+        result['next'] = nextGuess.lower()
+        result.update(judgeGuess(solver, board, result['next'], ranked[:RANKED]))
+    return result
+
+
+def judgeGuess(solver: BoardSolver, board, guess: str, ranked: list[str]) -> dict:
+    '''
+    Whether guess scores as well as the best guess, and its place in ranked, the board's top
+    guesses
+    '''
+    scorer = solver.scorer
+    nextRank = ranked.index(guess) + 1 if guess in ranked else None
+    if guess not in scorer.guessIndex.position:
+        return {'optimal': False, 'nextRank': None, 'valid': False}
+    candidates = board.candidateIndexes()
+    if len(candidates) <= 2:
+        return {'optimal': guess in board.words(), 'nextRank': nextRank}
+    if guess == ranked[0]:
+        return {'optimal': True, 'nextRank': nextRank}
+    guesses = np.array([scorer.guessIndex.position[guess], scorer.guessIndex.position[ranked[0]]])
+    scores = scorer.rankScores(guesses, candidates, solver.strategy)
+    return {'optimal': bool(scores[0] >= scores[1] - OPTIMAL_EPSILON), 'nextRank': nextRank}
+
+
+def evaluateLine(solver: BoardSolver, lineNo: int, line: str, top: int) -> dict:
+    result = evaluateRecord(solver, line, top)
+    if 'error' in result:
+        result['line'] = lineNo
+    return result
+
+
+def _evaluateBatch(args) -> list[dict]:
+    lines, top = args
+    solver = shared('solver')
+    return [evaluateLine(solver, lineNo, line, top) for lineNo, line in lines]
+
+
+def streamResults(solver: BoardSolver, lines: Iterable[str], top: int = 5,
+                  workers: int = 1) -> Iterator[dict]:
+    '''Evaluate the JSONL records in lines, yielding the results in input order'''
+    records = ((lineNo, line) for lineNo, line in enumerate(lines, 1) if line.strip())
+    if workers <= 1:
+        for lineNo, line in records:
+            yield evaluateLine(solver, lineNo, line, top)
+        return
+    with forkPool(workers, solver=solver) as pool:
+        while batch := list(islice(records, BATCH_SIZE * workers)):
+            chunks = [(chunk, top) for chunk in splitWork(batch, workers)]
+            for results in pool.map(_evaluateBatch, chunks):
+                yield from results
@@ -0,0 +1,135 @@
+# Decision tree solver: for every candidate set reachable from the opening, the guess that
+# minimises the expected number of guesses.
+#
+# The search is depth limited and only tries the `width` best guesses by entropy at each
+# node, so it is optimal within that beam. Costs are summed guess counts over the
+# candidates, every node gets a budget from its parent and stops as soon as it cannot beat
+# it (alpha-beta style), and solved subproblems are memoised on a hash of the sorted
+# candidate indexes. The finished tree is saved as JSON for Wordle to walk at play time.
+
+import json
+import hashlib
+from os.path import join as pjoin, exists
+
+import numpy as np
+
+from patterns import WORDS_DIR, wordListsHash, patternToStr, allGreen
+from strategy import GuessScorer, ENTROPY
+
+INFINITE = float('inf')
+TREE_WIDTH = 5   # Guesses tried at each node
+TREE_DEPTH = 6   # Most guesses allowed to find any answer
+
+
+def lowerBound(size: int) -> int:
+    '''Fewest total guesses that can solve size candidates: only one can be right first time'''
+    return 1 if size == 1 else 2 * size - 1
+
+
+class TreeSolver:
+    def __init__(self, scorer: GuessScorer, width: int = TREE_WIDTH,
+                 maxDepth: int = TREE_DEPTH) -> None:
+        self.scorer = scorer
+        self.width = width
+        self.maxDepth = maxDepth
+        self.wordLen = scorer.guessIndex.codes.shape[1]
+        self.allGreen = allGreen(self.wordLen)
+        self.memo: dict[tuple[bytes, int], tuple[float, str]] = {}
+        self.nodes = 0
+
+    def key(self, candidates: np.ndarray, depth: int) -> tuple[bytes, int]:
+        digest = hashlib.blake2b(np.sort(candidates).astype(np.int32).tobytes(), digest_size=16)
+        return digest.digest(), depth
+
+    def partition(self, guess: str, candidates: np.ndarray) -> list[tuple[int, np.ndarray]]:
+        '''The candidates split by their feedback to guess, largest group first'''
+        guessRow = np.array([self.scorer.guessIndex.position[guess]])
+        patterns = self.scorer.patterns(guessRow, candidates)[0]
+        codes, inverse = np.unique(patterns, return_inverse=True)
+        groups = [(int(code), candidates[inverse == i]) for i, code in enumerate(codes)]
+        return sorted(groups, key=lambda x: -len(x[1]))
+
+    def solve(self, candidates: np.ndarray, depth: int | None = None,
+              budget: float = INFINITE) -> float:
+        '''
+        Total guesses needed to solve every candidate from here with at most depth more
+        guesses, or INFINITE when that cannot be done for less than budget
+        '''
+        if depth is None:
+            depth = self.maxDepth
+        n = len(candidates)
+        if n == 1:
+            return 1 if budget > 1 else INFINITE
+        if depth <= 1:
+            return INFINITE
+        if n == 2:
+            return 3 if budget > 3 else INFINITE
+        key = self.key(candidates, depth)
+        if key in self.memo:
+            cost = self.memo[key][0]
+            return cost if cost < budget else INFINITE
+        self.nodes += 1
+        best = budget
+        bestGuess = None
+        for guess in self.scorer.rank(candidates, ENTROPY, limit=self.width):
+            groups = self.partition(guess, candidates)
+            if len(groups) == 1 and groups[0][0] != self.allGreen:
+                continue  # Tells us nothing
+            remaining = sum(lowerBound(len(g)) for p, g in groups if p != self.allGreen)
+            total = float(n)
+            if total + remaining >= best:
+                continue
+            for pattern, group in groups:
+                if pattern == self.allGreen:
+                    continue
+                remaining -= lowerBound(len(group))
+                total += self.solve(group, depth - 1, best - total - remaining)
+                if total + remaining >= best:
+                    break
+            else:
+                best = total
+                bestGuess = guess
+        if bestGuess is None:
+            return INFINITE
+        self.memo[key] = (best, bestGuess)
+        return best
+
+    def bestGuess(self, candidates: np.ndarray, depth: int) -> str:
+        if len(candidates) <= 2:
+            return self.scorer.answerIndex.words[candidates[0]]
+        return self.memo[self.key(candidates, depth)][1]
+
+    def build(self, candidates: np.ndarray, depth: int | None = None) -> dict:
+        '''The solved tree from candidates as nested {"guess": ..., "next": {pattern: ...}}'''
+        if depth is None:
+            depth = self.maxDepth
+            if self.solve(candidates, depth) == INFINITE:
+                raise ValueError(f'No tree within {depth} guesses')
+        guess = self.bestGuess(candidates, depth)
+        node: dict = {'guess': guess}
+        children = {}
+        for pattern, group in self.partition(guess, candidates):
+            if pattern != self.allGreen:
+                children[patternToStr(pattern, self.wordLen)] = self.build(group, depth - 1)
+        if children:
+            node['next'] = children
+        return node
+
+
+def treeFile(guesses: list[str], answers: list[str]) -> str:
+    return pjoin(WORDS_DIR, f'solve-tree.{wordListsHash(guesses, answers)}.json')
+
+
+def saveTree(tree: dict, guesses: list[str], answers: list[str], expected: float) -> str:
+    fileName = treeFile(guesses, answers)
+    with open(fileName, 'w') as outFD:
+        json.dump({'expected': expected, 'tree': tree}, outFD, separators=(',', ':'))
+    return fileName
+
+
+def loadTree(guesses: list[str], answers: list[str]) -> dict | None:
+    fileName = treeFile(guesses, answers)
+    if not exists(fileName):
+        return None
+    with open(fileName) as inFD:
+        return json.load(inFD)['tree']
@@ -0,0 +1,94 @@
+# Local store of the answer words that Wordle has already used.
+#
+# `wordle refresh-used` fetches the list, from the stadafa.com page by default or from any
+# stand-in URL or local file, and merges it into wordle-words/used-words.json along with
+# the time of the fetch. Starting the solver only ever reads the local store.
+
+import re
+import json
+import time
+from datetime import datetime, timezone
+from os.path import join as pjoin, exists
+
+from utils import ScriptError
+from words import ROOT_DIR
+
+USED_WORDS_URL = 'https://www.stadafa.com/2021/09/every-worlde-word-so-far-updated-daily.html'
+USED_WORDS_FILE = pjoin(ROOT_DIR, 'wordle-words', 'used-words.json')
+STALE_DAYS = 7  # Warn when the store has not been refreshed for this long
+
+
+class UsedWords:
+    def __init__(self, words: list[str], fetched: float, source: str) -> None:
+        self.words = words
+        self.fetched = fetched
+        self.source = source
+
+    @property
+    def ageDays(self) -> float:
+        return (time.time() - self.fetched) / 86400
+
+    def __str__(self) -> str:
+        when = datetime.fromtimestamp(self.fetched, timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+        return f'{len(self.words)} used words from {self.source}, fetched {when}'
+
+
+def parseUsedWords(text: str) -> list[str]:
+    '''
+    Words from the stadafa.com HTML ("<p>123. WORD ..." lines), or from a plain list with
+    one word per line when there is no HTML
+    '''
+    words = []
+    for line in text.splitlines():
+        usedWord = re.search(r'^<p>[0-9]+\. (\w+?) ', line)
+        if usedWord:
+            words.append(usedWord.group(1).lower())
+    if words:
+        return words
+    return [line.strip().lower() for line in text.splitlines()
+            if re.fullmatch(r'[A-Za-z]+', line.strip())]
+
+
+def fetchUsedWords(source: str) -> list[str]:
+    if re.match(r'https?://', source):
+        import requests  # Only needed when refreshing from the network
+        try:
+            r = requests.get(source, timeout=30)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            raise ScriptError(f'Unable to fetch used words from {source}: {e}') from None
+        return parseUsedWords(r.content.decode(errors='replace'))
+    try:
+        with open(source) as inFD:
+            return parseUsedWords(inFD.read())
+    except OSError as e:
+        raise ScriptError(f'Unable to read used words from {source}: {e}') from None
+
+
+def loadUsedWords(fileName: str = USED_WORDS_FILE) -> UsedWords | None:
+    if not exists(fileName):
+        return None
+    with open(fileName) as inFD:
+        data = json.load(inFD)
+    return UsedWords(data['words'], data['fetched'], data['source'])
+
+
+def saveUsedWords(usedWords: UsedWords, fileName: str = USED_WORDS_FILE) -> None:
+    with open(fileName, 'w') as outFD:
+        json.dump({'fetched': usedWords.fetched, 'source': usedWords.source,
+                   'words': usedWords.words}, outFD, indent=1)
+
+
+def refreshUsedWords(source: str = USED_WORDS_URL,
+                     fileName: str = USED_WORDS_FILE) -> tuple[UsedWords, int]:
+    '''
+    Merge the words from source into the store, keeping the words already there.
+    Returns the new store and the number of words that were added.
+    '''
+    current = loadUsedWords(fileName)
+    words = current.words if current else []
+    known = set(words)
+    added = [w for w in dict.fromkeys(fetchUsedWords(source)) if w not in known]
+    usedWords = UsedWords(words + added, time.time(), source)
+    saveUsedWords(usedWords, fileName)
+    return usedWords, len(added)
@@ -17,6 +17,8 @@ class ScriptError(Exception):
         super().__init__(*args)
 
 class KeyStroke:
+    __slots__ = ('key', 'keyType')
+
     def __init__(self, key: str, keyType: int| str) -> None:
         self.key = key
         self.keyType = keyType
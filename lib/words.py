@@ -1,15 +1,179 @@
 # answerWords and allowedGuesses are sorted by frequency as found in the Google Corpus
 
-from os.path import join as pjoin, dirname, abspath
+from os.path import join as pjoin, dirname, abspath, exists, getmtime, relpath
+
+import numpy as np
+
+from utils import ScriptError
 
 
 ROOT_DIR = pjoin(abspath(dirname(__file__)), '..')
 ANSWER_WORDS_FILE = pjoin(ROOT_DIR, 'wordle-words', 'answer-words.manual.sorted.by.freq.txt')
 ALLOWED_GUESSES_FILE = pjoin(ROOT_DIR, 'wordle-words', 'allowed-guesses.wordle-code.sorted.by.freq.txt')
+ANSWER_CORPUS_FILE = pjoin(ROOT_DIR, 'wordle-words', 'answer-words.corpus.npy')
+ALLOWED_CORPUS_FILE = pjoin(ROOT_DIR, 'wordle-words', 'allowed-guesses.corpus.npy')
+COUNTS_FILE = pjoin(ROOT_DIR, 'wordle-words', 'word-counts.txt')
+WORD_LENGTHS = range(4, 9)  # Eight letter patterns still pack into a uint16
+
+# Priors: the chance a word is picked as an answer, a sigmoid over its log10 Google unigram
+# count. Without the counts from mkWordleWords.py they are estimated from the frequency
+# order with Zipf's law, count = ZIPF_TOP / (rank + 1).
+PRIOR_CENTRE = 5.5     # log10 count with a prior of one half
+PRIOR_WIDTH = 0.5      # log10 counts per e-fold of the odds
+ZIPF_TOP = 1.2e9       # About the count of "about", the most common five letter word
+
+def wordFiles(wordLen: int = 5) -> list[tuple[str, str]]:
+    '''
+    (text file, corpus file) for the answer words and then the allowed guesses of a word
+    length. Lengths other than 5 use answer-words.len<N>.sorted.by.freq.txt and so on.
+    '''
+    if wordLen == 5:
+        return [(ANSWER_WORDS_FILE, ANSWER_CORPUS_FILE),
+                (ALLOWED_GUESSES_FILE, ALLOWED_CORPUS_FILE)]
+    if wordLen not in WORD_LENGTHS:
+        raise ScriptError(f'Word length must be {WORD_LENGTHS[0]} to {WORD_LENGTHS[-1]}, '
+                          f'not {wordLen}')
+    return [(pjoin(ROOT_DIR, 'wordle-words', f'{name}.len{wordLen}.sorted.by.freq.txt'),
+             pjoin(ROOT_DIR, 'wordle-words', f'{name}.len{wordLen}.corpus.npy'))
+            for name in ['answer-words', 'allowed-guesses']]
+
+def checkWordFile(textFile: str, wordLen: int) -> None:
+    if not exists(textFile):
+        raise ScriptError(f'No {wordLen} letter word list, expected {relpath(textFile, ROOT_DIR)} '
+                          'with one word per line, most frequent first')
+
+def readWordFile(textFile: str, wordLen: int) -> list[str]:
+    checkWordFile(textFile, wordLen)
+    with open(textFile) as inFD:
+        return inFD.read().splitlines()
+
+def loadWords(wordLen: int = 5):
+    (answerFile, _), (allowedFile, _) = wordFiles(wordLen)
+    return readWordFile(answerFile, wordLen), readWordFile(allowedFile, wordLen)
+
+def encodeWords(words: list[str]) -> np.ndarray:
+    '''Return an (n, wordLen) uint8 array of letter codes, a = 0 ... z = 25'''
+    wordLen = len(words[0]) if words else 0
+    codes = np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8)
+    return (codes.reshape(len(words), wordLen) - ord('a')).astype(np.uint8)
+
+def corpusDtype(wordLen: int = 5) -> np.dtype:
+    '''
+    One fixed width corpus record per word: the word itself, a bitmask of the letters it
+    contains (bit n for letter chr(ord('a') + n)), its letter counts and its prior
+    '''
+    return np.dtype([('word', f'S{wordLen}'), ('mask', '<u4'),
+                     ('counts', 'u1', (26,)), ('prior', '<f4')])
+
+def loadCounts() -> dict[str, int] | None:
+    '''The unigram counts kept by mkWordleWords.py, None before it has been run'''
+    if not exists(COUNTS_FILE):
+        return None
+    with open(COUNTS_FILE) as inFD:
+        return {word: int(count) for word, count in (line.split() for line in inFD)}
+
+def wordPriors(words: list[str], counts: dict[str, int] | None = None) -> np.ndarray:
+    if counts is None:
+        estimated = ZIPF_TOP / np.arange(1, len(words) + 1)
+    else:
+        estimated = np.array([counts.get(word, 0) for word in words], dtype=np.float64)
+    logCounts = np.log10(np.maximum(estimated, 1))
+    return (1 / (1 + np.exp((PRIOR_CENTRE - logCounts) / PRIOR_WIDTH))).astype(np.float32)
+
+def makeRecords(words: list[str], counts: dict[str, int] | None = None) -> np.ndarray:
+    '''Corpus records for words, which must be in frequency order'''
+    codes = encodeWords(words)
+    records = np.zeros(len(words), dtype=corpusDtype(codes.shape[1]))
+    records['word'] = words
+    records['prior'] = wordPriors(words, counts)
+    rows = np.arange(len(words))
+    for col in range(codes.shape[1]):
+        records['counts'][rows, codes[:, col]] += 1
+        records['mask'] |= (1 << codes[:, col].astype(np.uint32))
+    return records
+
+def writeCorpus(words: list[str], fileName: str, counts: dict[str, int] | None = None) -> None:
+    np.save(fileName, makeRecords(words, counts))
+
+def loadCorpus(wordLen: int = 5):
+    '''
+    Memory-map the binary corpora for a word length and return (answerIndex, guessIndex).
+    A corpus that is missing, older than its text file or the counts, or in an older format
+    is first rebuilt from the text file, so each length is only built the first time it is
+    played.
+    '''
+    indexes = []
+    for textFile, corpusFile in wordFiles(wordLen):
+        checkWordFile(textFile, wordLen)
+        records = None
+        if exists(corpusFile) and getmtime(corpusFile) >= getmtime(textFile) \
+                and (not exists(COUNTS_FILE) or getmtime(corpusFile) >= getmtime(COUNTS_FILE)):
+            records = np.load(corpusFile, mmap_mode='r')
+        if records is None or records.dtype != corpusDtype(wordLen):
+            words = readWordFile(textFile, wordLen)
+            if any(len(word) != wordLen for word in words):
+                raise ScriptError(f'{relpath(textFile, ROOT_DIR)} has words that are not '
+                                  f'{wordLen} letters long')
+            writeCorpus(words, corpusFile, loadCounts())
+            records = np.load(corpusFile, mmap_mode='r')
+        indexes.append(WordIndex.fromRecords(records))
+    return indexes[0], indexes[1]
+
+class WordIndex:
+    '''
+    Array backed view of a word list: letter codes per position, letter counts, letter
+    masks and priors per word. The python word list is only decoded when something asks
+    for it.
+    '''
+    def __init__(self, words: list[str]) -> None:
+        self.setRecords(makeRecords(words))
+        self._words: list[str] | None = words
+
+    @classmethod
+    def fromRecords(cls, records: np.ndarray) -> 'WordIndex':
+        index = cls.__new__(cls)
+        index.setRecords(records)
+        return index
+
+    def setRecords(self, records: np.ndarray) -> None:
+        self.records = records
+        self._words = None
+        self._position: dict[str, int] | None = None
+        wordLen = records.dtype['word'].itemsize
+        self.keys = records['word']
+        self.codes = np.ascontiguousarray(self.keys).view(np.uint8) \
+            .reshape(len(records), wordLen) - ord('a')
+        self.counts = records['counts']
+        self.masks = records['mask']
+        self.priors = records['prior']
+
+    @property
+    def words(self) -> list[str]:
+        if self._words is None:
+            self._words = self.keys.astype(f'U{self.keys.dtype.itemsize}').tolist()
+        return self._words
+
+    @property
+    def position(self) -> dict[str, int]:
+        if self._position is None:
+            self._position = {w: i for i, w in enumerate(self.words)}
+        return self._position
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def select(self, indices: np.ndarray) -> list[str]:
+        words = self.words
+        return [words[i] for i in indices]
+
+    def subset(self, indices: np.ndarray) -> 'WordIndex':
+        return WordIndex.fromRecords(self.records[indices])
 
-def loadWords():
-    with open(ANSWER_WORDS_FILE) as inFD:
-        answerWords = inFD.read().splitlines()
-    with open(ALLOWED_GUESSES_FILE) as inFD:
-        allowedGuesses = inFD.read().splitlines()
-    return answerWords, allowedGuesses
+    def without(self, words: list[str]) -> 'WordIndex':
+        '''
+        A new index without any of words, compared as fixed width byte strings. Words of
+        another length are left out first, as the conversion would cut them short.
+        '''
+        wordLen = self.codes.shape[1]
+        exclude = np.array([word for word in words if len(word) == wordLen], dtype=self.keys.dtype)
+        return self.subset(np.flatnonzero(~np.isin(self.keys, exclude)))
@@ -0,0 +1,134 @@
+# Worst case analysis of a guess policy over every answer at once.
+#
+# Rather than playing each answer as its own game, the analysis walks the policy's game
+# tree: at each board state the policy picks one guess, the state's candidates are split
+# into feedback buckets with a single bincount over their pattern codes, and each bucket
+# is followed in turn. Every answer ends in exactly one leaf, so the policy is asked for a
+# guess once per distinct board state rather than once per answer and row.
+#
+# The absurdle adversary follows the same policy, but answers every guess with the largest
+# bucket, so it only ever keeps the answers the policy finds hardest to separate.
+
+import numpy as np
+
+from board import Row, Board
+from boardsolver import BoardSolver, BoardState
+from patterns import patternToStr, scorePatterns, allGreen
+from words import encodeWords
+from bench import MAX_ROWS
+
+ROW_LIMIT = 12  # Stop following a policy that has not solved a bucket after this many rows
+
+
+class Bucket:
+    '''The largest bucket seen after a row, and the board that left it'''
+    def __init__(self) -> None:
+        self.size = 0
+        self.board = Board()
+
+
+class WorstCase:
+    def __init__(self) -> None:
+        self.guesses: dict[str, int] = {}       # Guesses needed per answer
+        self.buckets: dict[int, Bucket] = {}    # Largest bucket per row
+        self.states = 0                         # Board states ranked
+        self.unsolved: list[str] = []           # Answers cut off at ROW_LIMIT
+
+
+def partition(solver: BoardSolver, guess: str,
+              candidates: np.ndarray) -> list[tuple[int, np.ndarray]]:
+    '''The candidates split by their feedback to guess, largest bucket first'''
+    scorer = solver.scorer
+    position = scorer.guessIndex.position.get(guess)
+    if position is not None:
+        patterns = scorer.patterns(np.array([position]), candidates)[0]
+    else:
+        patterns = scorePatterns(encodeWords([guess]), scorer.answerIndex.codes[candidates])[0]
+    counts = np.bincount(patterns, minlength=scorer.numPatterns)
+    order = np.argsort(patterns, kind='stable')
+    codes = np.flatnonzero(counts)
+    buckets = np.split(candidates[order], np.cumsum(counts[codes])[:-1])
+    # Largest first, then the pattern with the least revealed, as absurdle does
+    return sorted(zip(codes.tolist(), buckets), key=lambda x: (-len(x[1]), x[0]))
+
+
+def policyGuess(solver: BoardSolver, board: Board, candidates: np.ndarray) -> str:
+    state = BoardState(solver)
+    state.rows = board
+    state.candidates = candidates
+    return solver.rankGuesses(state, 1)[0]
+
+
+def analyse(solver: BoardSolver) -> WorstCase:
+    '''Follow the solver's guesses from every answer's point of view'''
+    result = WorstCase()
+    answerIndex = solver.scorer.answerIndex
+    green = allGreen(solver.wordLen)
+
+    def walk(board: Board, candidates: np.ndarray) -> None:
+        if len(board) >= ROW_LIMIT:
+            result.unsolved.extend(answerIndex.select(candidates))
+            return
+        result.states += 1
+        guess = policyGuess(solver, board, candidates)
+        for pattern, bucket in partition(solver, guess, candidates):
+            nextBoard = board.add(Row(guess, pattern))
+            if pattern == green:
+                result.guesses[guess] = len(nextBoard)
+                continue
+            worst = result.buckets.setdefault(len(nextBoard), Bucket())
+            if len(bucket) > worst.size:
+                worst.size, worst.board = len(bucket), nextBoard
+            walk(nextBoard, bucket)
+
+    walk(Board(), np.arange(len(answerIndex)))
+    return result
+
+
+def adversary(solver: BoardSolver) -> tuple[Board, list[int]]:
+    '''
+    Play the solver against an absurdle style adversary that keeps the largest bucket
+    every row. Returns the board and the size of each bucket kept, last row all green.
+    '''
+    candidates = np.arange(len(solver.scorer.answerIndex))
+    board = Board()
+    sizes = []
+    while len(board) < ROW_LIMIT:
+        guess = policyGuess(solver, board, candidates)
+        pattern, candidates = partition(solver, guess, candidates)[0]
+        board = board.add(Row(guess, pattern))
+        sizes.append(len(candidates))
+        if pattern == allGreen(solver.wordLen):
+            break
+    return board, sizes
+
+
+def boardStr(board: Board, wordLen: int) -> str:
+    return ', '.join(f'{row.word} {patternToStr(row.pattern, wordLen)}' for row in board)
+
+
+def worstCaseReport(solver: BoardSolver, top: int = 20) -> str:
+    result = analyse(solver)
+    wordLen = solver.wordLen
+    counts = sorted(result.guesses.items(), key=lambda x: -x[1])
+    distribution: dict[int, int] = {}
+    for _, n in counts:
+        distribution[n] = distribution.get(n, 0) + 1
+    failures = [word for word, n in counts if n > MAX_ROWS] + result.unsolved
+    lines = [f'Policy: {solver.strategy} over {len(solver.scorer.answerIndex)} answers, '
+             f'{result.states} board states ranked',
+             'Guesses: ' + ', '.join(f'{n}: {distribution[n]}' for n in sorted(distribution)),
+             f'Mean guesses: {sum(n for _, n in counts) / max(1, len(counts)):.3f}',
+             f'Failures (> {MAX_ROWS} rows): {len(failures)}'
+             + (f' {", ".join(failures[:top])}' if failures else ''),
+             f'Hardest {min(top, len(counts))} words:']
+    lines += [f'  {word}: {n}' for word, n in counts[:top]]
+    lines.append('Largest bucket left after each row:')
+    for row in sorted(result.buckets):
+        bucket = result.buckets[row]
+        lines.append(f'  Row {row}: {bucket.size} after {boardStr(bucket.board, wordLen)}')
+    board, sizes = adversary(solver)
+    lines.append(f'Adversary keeping the largest bucket: {len(board)} guesses')
+    lines += [f'  {row.word} {patternToStr(row.pattern, wordLen)} leaves {size}'
+              for row, size in zip(board, sizes)]
+    return '\n'.join(lines)
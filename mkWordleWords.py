@@ -1,56 +1,122 @@
 #!/usr/bin/env python3
+'''
+Build the frequency sorted word lists and everything derived from them in one pass:
+the sorted answer and allowed guess lists, the unigram counts behind the answer priors,
+their binary corpora (letter masks, counts and priors) and the pattern table. The Google
+unigram CSV is streamed and only the rows for words in either list are kept. Nothing is
+rebuilt while the input files hash the same as last time, unless --force is given.
+'''
 
 import sys, os
-from os.path import join as pJoin
+from os.path import join as pJoin, exists
 
-sys.path.append(pJoin(os.getcwd(), '../lib'))
+sys.path.append(pJoin(os.path.dirname(os.path.abspath(__file__)), 'lib'))
 
 import csv
+import json
+import hashlib
+from argparse import ArgumentParser
+from typing import Any
 
-with open('wordle-words/answer-words.manual.txt') as inFD:
-    answerWords = inFD.read().splitlines()
+from words import (writeCorpus, ROOT_DIR, ANSWER_WORDS_FILE, ALLOWED_GUESSES_FILE,
+                   ANSWER_CORPUS_FILE, ALLOWED_CORPUS_FILE, COUNTS_FILE)
+from patterns import loadPatternTable, patternTableFile
 
-with open('wordle-words/allowed-guesses.wordle-code.txt') as inFD:
-    allowedGuesses = inFD.read().splitlines()
+WORD_LEN = 5
+ANSWER_INPUT = pJoin(ROOT_DIR, 'wordle-words', 'answer-words.manual.txt')
+ALLOWED_INPUT = pJoin(ROOT_DIR, 'wordle-words', 'allowed-guesses.wordle-code.txt')
+FREQ_CSV = pJoin(ROOT_DIR, 'google-words', 'unigram_freq.csv')
+STAMP_FILE = pJoin(ROOT_DIR, 'wordle-words', 'build-stamp.json')
+HASH_CHUNK = 1 << 20
 
-wordFreq = {}
 
-for word, count in csv.reader(open('google-words/unigram_freq.csv')):
-    wordFreq[word] = count
+def fileHash(fileName: str) -> str:
+    sha = hashlib.sha1()
+    with open(fileName, 'rb') as inFD:
+        while chunk := inFD.read(HASH_CHUNK):
+            sha.update(chunk)
+    return sha.hexdigest()
 
-# Process the Answer Words
-newAnswerWordsByFreq = {}
-with open('wordle-words/answer-words.manual.sorted.by.freq.txt', 'wt') as outFD:
-    missingWords = 0
-    print(f'Missing words in Answer Words: ', end='')
-    for word in answerWords:
-        try:
-            newAnswerWordsByFreq[word] = wordFreq[word]
-        except KeyError:
-            newAnswerWordsByFreq[word] = 0
-            print(f'{word}, ', end='')
-            missingWords += 1
 
-    print(f"\nCount: {missingWords}")
-    for word, freq in sorted(newAnswerWordsByFreq.items(), key=lambda x: int(x[1]), reverse=True):
-        print(word, file=outFD)
+def readWords(fileName: str) -> list[str]:
+    '''The words in file order, without duplicates'''
+    with open(fileName) as inFD:
+        return list(dict.fromkeys(inFD.read().splitlines()))
 
-# Process the Allowed Guesses Words
-with open('wordle-words/allowed-guesses.wordle-code.sorted.by.freq.txt', 'wt') as outFD:
-    missingWords = 0
-    print(f'Missing words in Allowed Guesses: ', end='')
-    for word in allowedGuesses:
-        try:
-            newAnswerWordsByFreq[word] = wordFreq[word]
-        except KeyError:
-            newAnswerWordsByFreq[word] = 0
-            print(f'{word}, ', end='')
-            missingWords += 1
 
-    print(f"\nCount: {missingWords}")
-    for word, freq in sorted(newAnswerWordsByFreq.items(), key=lambda x: int(x[1]), reverse=True):
-        print(word, file=outFD)
+def readFrequencies(csvFile: str, wanted: set[str], wordLen: int = WORD_LEN) -> dict[str, int]:
+    '''Stream the word,count CSV keeping the counts of the wanted words only'''
+    freq = {}
+    with open(csvFile, newline='') as inFD:
+        for word, count in csv.reader(inFD):
+            if len(word) == wordLen and word in wanted and count.isdigit():
+                freq[word] = int(count)
+    return freq
 
 
+def sortByFreq(words: list[str], freq: dict[str, int], label: str) -> list[str]:
+    '''Most frequent first, reporting the words the CSV does not have'''
+    missing = [word for word in words if word not in freq]
+    print(f'Missing words in {label}: {", ".join(missing)}\nCount: {len(missing)}')
+    return sorted(words, key=lambda word: freq.get(word, 0), reverse=True)
 
 
+def writeWords(words: list[str], fileName: str) -> None:
+    with open(fileName, 'wt') as outFD:
+        outFD.write(''.join(f'{word}\n' for word in words))
+
+
+def writeCounts(freq: dict[str, int], fileName: str) -> None:
+    with open(fileName, 'wt') as outFD:
+        outFD.write(''.join(f'{word} {count}\n' for word, count in sorted(freq.items())))
+
+
+def build(csvFile: str = FREQ_CSV, force: bool = False, patternTable: bool = True) -> bool:
+    '''Returns False when the outputs were already up to date'''
+    inputs = {name: fileHash(name) for name in [ANSWER_INPUT, ALLOWED_INPUT, csvFile]}
+    stamp: dict[str, Any] = {'inputs': {os.path.relpath(k, ROOT_DIR): v for k, v in inputs.items()}}
+    outputs = [ANSWER_WORDS_FILE, ALLOWED_GUESSES_FILE, ANSWER_CORPUS_FILE, ALLOWED_CORPUS_FILE,
+               COUNTS_FILE]
+    if not force and exists(STAMP_FILE):
+        with open(STAMP_FILE) as inFD:
+            previous = json.load(inFD)
+        tableFile = previous.get('patternTableFile')
+        if previous.get('inputs') == stamp['inputs'] and all(exists(x) for x in outputs) \
+                and (not patternTable or (tableFile and exists(pJoin(ROOT_DIR, tableFile)))):
+            return False
+    answerWords = readWords(ANSWER_INPUT)
+    allowedGuesses = readWords(ALLOWED_INPUT)
+    freq = readFrequencies(csvFile, set(answerWords) | set(allowedGuesses))
+    sortedAnswers = sortByFreq(answerWords, freq, 'Answer Words')
+    sortedGuesses = sortByFreq(allowedGuesses, freq, 'Allowed Guesses')
+    writeCounts(freq, COUNTS_FILE)
+    for words, textFile, corpusFile in [(sortedAnswers, ANSWER_WORDS_FILE, ANSWER_CORPUS_FILE),
+                                        (sortedGuesses, ALLOWED_GUESSES_FILE, ALLOWED_CORPUS_FILE)]:
+        writeWords(words, textFile)
+        writeCorpus(words, corpusFile, freq)
+    if patternTable:
+        loadPatternTable(sortedGuesses, sortedAnswers)
+        stamp['patternTableFile'] = os.path.relpath(patternTableFile(sortedGuesses, sortedAnswers),
+                                                    ROOT_DIR)
+    with open(STAMP_FILE, 'w') as outFD:
+        json.dump(stamp, outFD, indent=1)
+    return True
+
+
+def main() -> int:
+    parser = ArgumentParser(description='Build the frequency sorted word lists, corpora and '
+                                        'pattern table')
+    parser.add_argument('--csv', default=FREQ_CSV,
+                        help='Google unigram word,count CSV (default google-words/unigram_freq.csv)')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='Rebuild even when the inputs have not changed')
+    parser.add_argument('--no-pattern-table', action='store_true',
+                        help='Skip the pattern table, it is otherwise built on first use')
+    args = parser.parse_args()
+    if not build(args.csv, args.force, not args.no_pattern_table):
+        print('Word lists are up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,382 @@
-
 import sys, os
+import json
+import argparse
+import asyncio
+from collections import Counter
+import numpy as np
+import pytest
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
-from wordle import Wordle
-from words import allowedGuesses, answerWords
+import wordle
+from wordle import Wordle, Global
+from mkWordleWords import readFrequencies, sortByFreq
+from words import loadWords, encodeWords, WordIndex, makeRecords, wordFiles, wordPriors
+from utils import ScriptError
+from strategy import GuessScorer, ENTROPY, MINIMAX, SCORE_BYTES
+from book import buildBook, saveBook, loadBook
+from tree import TreeSolver
+from board import Row, Board
+from boardsolver import BoardSolver, parseRows
+from server import SolverServer, HttpError
+from stream import streamResults
+from multiboard import MultiBoardSolver, playMulti
+from worstcase import analyse, adversary
+from bench import runBench, runBenchParallel, benchReport
+from instrument import instruments
+from cache import BoardCache
+from session import SessionLog, readSessions, lastSession, replaySession, SOLVED
+from usedwords import parseUsedWords, refreshUsedWords, loadUsedWords, UsedWords
+from patterns import (scorePattern, scorePatterns, patternFromLine, patternFromStr,
+                      patternToStr, buildPatternTable)
+
+Global.debug = False
+Global.includeUsed = True
+answerWords, allowedGuesses = loadWords()
 
 def test_makeGYB():
     w = Wordle(answerWords, allowedGuesses)
     correct = ['a: RIGHT_PLACE', 'b: ALL_WRONG', 'b: RIGHT_PLACE', 
                'c: WRONG_PLACE', 'e: ALL_WRONG']
     ans = [str(x) for x in w.makeGYB('abbce', 'aabac')]
-    assert ans == correct
\ No newline at end of file
+    assert ans == correct
+
+def test_patterns_match_makeGYB():
+    w = Wordle(answerWords, allowedGuesses)
+    guesses = ['abbce', 'speed', 'eerie', 'llama'] + allowedGuesses[::997]
+    answers = ['aabac', 'abide', 'erase', 'hello'] + answerWords[::97]
+    table = scorePatterns(encodeWords(guesses), encodeWords(answers))
+    for i, guess in enumerate(guesses):
+        for j, answer in enumerate(answers):
+            expected = patternFromLine(w.makeGYB(guess, answer))
+            assert table[i, j] == expected
+            assert scorePattern(guess, answer) == expected
+
+def test_pattern_strings():
+    assert patternToStr(patternFromStr('GBGYB')) == 'GBGYB'
+    assert patternFromStr('GGGGG') == 242
+    assert patternToStr(scorePattern('abbce', 'aabac')) == 'GBGYB'
+
+def test_buildPatternTable():
+    table = buildPatternTable(allowedGuesses[:600], answerWords[:50])
+    assert table.shape == (600, 50)
+    assert table[allowedGuesses.index(answerWords[7]), 7] == 242
+
+def test_calculateWords_matches_patterns():
+    for secret, guesses in [('abide', ['crane', 'spilt']), ('eerie', ['speed', 'geese']),
+                            ('llama', ['label', 'villa', 'allay'])]:
+        w = Wordle(answerWords, allowedGuesses)
+        expected = answerWords
+        for guess in guesses:
+            w.wordleLines[-1] = w.makeGYB(guess, secret)
+            w.makeConstraints()
+            words = w.calculateWords()
+            expected = [x for x in expected
+                        if scorePattern(guess, x) == scorePattern(guess, secret)]
+            assert words == expected
+            w.newWordleLine()
+
+def test_board_rows_commit_once():
+    w = Wordle(answerWords, allowedGuesses)
+    w.wordleLines[-1] = w.makeGYB('crane', 'abide')
+    w.makeConstraints()
+    w.makeConstraints()  # The retry path calls it again for the same row
+    assert w.board == Board((Row('crane', patternFromStr('BBYBG')),))
+    assert w.board.signature() == (('crane', patternFromStr('BBYBG')),)
+    assert len({w.board, Board().add(Row('crane', patternFromStr('BBYBG')))}) == 1
+    assert w.board[0].goodLetters() == {'a', 'e'}
+    w.reset()
+    assert len(w.board) == 0
+
+def test_board_cache(tmp_path):
+    fileName = str(tmp_path / 'cache.json')
+    cache = BoardCache('lists', maxSize=2, fileName=fileName)
+    board = (('crane', 5),)
+    cache.put(('candidates', board), np.arange(3))
+    cache.put(('guesses', board), ['moist'])
+    assert cache.get(('candidates', board)) is not None  # Now the most recently used
+    cache.put(('guesses', ()), ['crane'])
+    assert cache.get(('guesses', board)) is None and cache.evictions == 1
+    assert cache.hits == {'candidates': 1} and cache.misses == {'guesses': 1}
+    cache.save()
+    loaded = BoardCache('lists', fileName=fileName)
+    assert list(loaded.get(('candidates', board))) == [0, 1, 2]
+    assert loaded.get(('guesses', ())) == ['crane']
+    assert len(BoardCache('other lists', fileName=fileName)) == 0
+
+def test_hard_mode():
+    Global.hardMode = True
+    try:
+        for strategy in ['heuristic', 'entropy']:
+            Global.strategy = strategy
+            w = Wordle(answerWords[:500], allowedGuesses[:3000])
+            w.wordleLines[-1] = w.makeGYB('crane', 'abide')  # a yellow, e green
+            w.makeConstraints()
+            guesses = w.mkGuessList(w.calculateWords())
+            assert guesses and all(g[4] == 'e' and 'a' in g for g in guesses)
+    finally:
+        Global.hardMode = False
+        Global.strategy = 'heuristic'
+
+def test_used_words_only_for_five_letters(monkeypatch):
+    used = UsedWords(['bake', 'baker', 'crabs', 'which'], 0.0, 'test')
+    monkeypatch.setattr(wordle, 'loadUsedWords', lambda: used)
+    monkeypatch.setattr(Global, 'includeUsed', False)
+    words = ['bake', 'crab', 'spin', 'none']
+    assert Wordle(words, words).answerWords == words
+    assert 'which' not in Wordle(answerWords[:50], allowedGuesses).answerWords
+
+def test_word_lengths():
+    fours = sorted({w[:4] for w in answerWords[:400]})
+    guess, secret = fours[0], fours[-1]
+    w = Wordle(fours, fours)
+    assert w.wordLen == 4 and len(w.makeGYB(guess, secret)) == 4
+    w.wordleLines[-1] = w.makeGYB(guess, secret)
+    w.makeConstraints()
+    words = w.calculateWords()
+    assert secret in words
+    assert all(len(g) == 4 for g in w.mkGuessList(words))
+    eights = WordIndex(['abcdefgh', 'hgfedcba'])
+    assert GuessScorer(eights, eights).scoreBlock * 8 * 3**8 <= SCORE_BYTES
+    with pytest.raises(ScriptError):
+        wordFiles(9)
+
+def test_multiboard_scoring():
+    scorer = GuessScorer(WordIndex(allowedGuesses[:500]), WordIndex(answerWords[:300]))
+    multi = MultiBoardSolver(BoardSolver(scorer, ENTROPY))
+    sets = [np.arange(0, 300, 2), np.arange(0, 120), np.array([5, 250, 299])]
+    guesses = np.arange(500)
+    expected = sum(scorer.score(guesses, c, ENTROPY) for c in sets)
+    assert np.allclose(multi.scoreBoards(guesses, sets), expected)
+    secrets = [answerWords[3], answerWords[10], answerWords[200], answerWords[299]]
+    played = playMulti(multi, secrets)
+    assert set(secrets) <= set(played) and len(played) <= 12
+
+def test_worst_case():
+    answers = answerWords[:200]
+    solver = BoardSolver(GuessScorer(WordIndex(allowedGuesses[:800]), WordIndex(answers)), ENTROPY)
+    result = analyse(solver)
+    assert sorted(result.guesses) == sorted(answers) and not result.unsolved
+    board, sizes = adversary(solver)
+    assert sizes[0] == result.buckets[1].size and sizes[-1] == 1
+    assert len(board) <= max(result.guesses.values())
+
+def test_mkWordleWords_frequencies(tmp_path):
+    csvFile = tmp_path / 'unigram_freq.csv'
+    csvFile.write_text('word,count\nabout,900\nthere,800\nwhich,700\nthe,999\nzzzzz,5\n')
+    freq = readFrequencies(str(csvFile), {'which', 'about', 'zzzzz', 'cigar'})
+    assert freq == {'about': 900, 'which': 700, 'zzzzz': 5}
+    assert sortByFreq(['cigar', 'zzzzz', 'which', 'about'], freq, 'test') == \
+        ['about', 'which', 'zzzzz', 'cigar']
+
+def test_rank_strategies():
+    guesses = allowedGuesses[:400]
+    answers = answerWords[:300]
+    scorer = GuessScorer(WordIndex(guesses), WordIndex(answers))
+    candidates = np.arange(0, 300, 3)
+    worst = {g: max(Counter(scorePattern(g, answers[c]) for c in candidates).values())
+             for g in guesses}
+    best = scorer.rank(candidates, MINIMAX, limit=1)[0]
+    assert worst[best] == min(worst.values())
+    assert len(scorer.rank(candidates, ENTROPY, limit=5)) == 5
+    assert scorer.rank(candidates[:2], ENTROPY) == [answers[0], answers[3]]
+
+def test_priors():
+    words = answerWords[:50]
+    priors = wordPriors(words)
+    assert np.all(np.diff(priors) <= 0) and 0 < priors[-1] < priors[0] < 1
+    counts = {word: 10 for word in words}
+    counts[words[-1]] = 10 ** 8
+    assert wordPriors(words, counts).argmax() == len(words) - 1
+    scorer = GuessScorer(WordIndex(allowedGuesses[:400]), WordIndex(answerWords[:300]),
+                         usePriors=True)
+    candidates = np.arange(0, 300, 3)
+    assert len(scorer.rank(candidates, ENTROPY, limit=5)) == 5
+    assert scorer.rank(candidates[:2], ENTROPY)[0] == answerWords[0]
+    uniform = GuessScorer(scorer.guessIndex, scorer.answerIndex)
+    assert scorer.rank(candidates, MINIMAX, limit=5) == uniform.rank(candidates, MINIMAX, limit=5)
+
+def test_buildBook():
+    answers = answerWords[:200]
+    scorer = GuessScorer(WordIndex(allowedGuesses[:300]), WordIndex(answers))
+    book = buildBook(scorer, ENTROPY)
+    opener = book.first[0]
+    secret = answers[17]
+    second = book.secondGuesses(opener, patternToStr(scorePattern(opener, secret)))
+    assert second and len(second) <= 10
+    assert book.secondGuesses('zzzzz', 'BBBBB') is None
+
+def test_runBench():
+    Global.strategy = ENTROPY
+    try:
+        w = Wordle(answerWords, allowedGuesses)
+        results = runBench(w, answerWords[:5])
+    finally:
+        Global.strategy = 'heuristic'
+    assert [r.secret for r in results] == answerWords[:5]
+    assert all(r.solved and r.guesses[-1] == r.secret for r in results)
+    assert 'Games: 5' in benchReport(results, 1.0)
+
+def test_parallel_matches_serial():
+    scorer = GuessScorer(WordIndex(allowedGuesses[:5000]), WordIndex(answerWords[:100]),
+                         workers=2)
+    guesses = np.arange(5000)
+    candidates = np.arange(100)
+    assert np.allclose(scorer.score(guesses, candidates, ENTROPY),
+                       scorer.scoreSerial(guesses, candidates, ENTROPY))
+    scorer.pool.terminate()
+    w = Wordle(answerWords, allowedGuesses)
+    serial = runBench(w, answerWords[:4])
+    parallel = runBenchParallel(w, answerWords[:4], 2)
+    assert [r.guesses for r in serial] == [r.guesses for r in parallel]
+
+def test_usedWords_store(tmp_path):
+    assert parseUsedWords('<p>12. CIGAR June</p>\n<p>x</p>') == ['cigar']
+    assert parseUsedWords('cigar\nRebut\n') == ['cigar', 'rebut']
+    store = str(tmp_path / 'used.json')
+    source = tmp_path / 'used.txt'
+    source.write_text('cigar\nrebut\n')
+    refreshUsedWords(str(source), store)
+    source.write_text('rebut\nsissy\n')
+    usedWords, added = refreshUsedWords(str(source), store)
+    assert added == 1
+    assert loadUsedWords(store).words == ['cigar', 'rebut', 'sissy']
+
+def test_WordIndex_records():
+    index = WordIndex.fromRecords(makeRecords(['about', 'eerie', 'llama']))
+    assert index.words == ['about', 'eerie', 'llama']
+    assert (index.codes == encodeWords(index.words)).all()
+    assert index.counts[1, ord('e') - ord('a')] == 3
+    assert index.masks[2] == sum(1 << (ord(c) - ord('a')) for c in 'lam')
+    assert index.without(['eerie', 'zzzzz']).words == ['about', 'llama']
+    assert index.without(['abouts', 'llamas', 'eer']).words == index.words  # Not cut short
+
+def test_instruments_rows(tmp_path):
+    statsFile = tmp_path / 'stats.jsonl'
+    instruments.enable(str(statsFile))
+    try:
+        w = Wordle(answerWords, allowedGuesses)
+        runBench(w, ['abide'], opener='crane')
+    finally:
+        instruments.close()
+    rows = [json.loads(line) for line in statsFile.read_text().splitlines()]
+    assert rows[0]['row'] == 1 and rows[0]['guess'] == 'crane' and rows[0]['secret'] == 'abide'
+    assert rows[0]['counters']['calculateWords.scanned'] == len(answerWords)
+    assert rows[0]['counters']['mkAntiWordList.combinations'] > 0
+    assert 'calculateWords' in rows[0]['ms']
+
+def test_solve_tree():
+    answers = answerWords[:60]
+    scorer = GuessScorer(WordIndex(allowedGuesses[:2000]), WordIndex(answers))
+    solver = TreeSolver(scorer, width=3)
+    candidates = np.arange(len(answers))
+    cost = solver.solve(candidates)
+    tree = solver.build(candidates)
+    total = 0
+    for secret in answers:
+        node = tree
+        for guesses in range(1, 7):
+            if node['guess'] == secret:
+                break
+            node = node['next'][patternToStr(scorePattern(node['guess'], secret))]
+        assert node['guess'] == secret
+        total += guesses
+    assert total == cost
+
+def test_server_sessions():
+    solver = BoardSolver(GuessScorer(WordIndex(allowedGuesses[:3000]), WordIndex(answerWords)))
+    server = SolverServer(solver)
+
+    async def requests():
+        solved = await server.route('POST', '/solve', {'rows': [['crane', 'BYBBB']]})
+        session = await server.route('POST', '/sessions', {'rows': [['crane', 'BYBBB']]})
+        assert session['candidates'] == solved['candidates']
+        path = f'/sessions/{session["session"]}'
+        narrowed = await server.route('POST', path + '/rows', {'rows': [['moist', 'BBBBB']]})
+        assert narrowed['rows'] == 2 and narrowed['candidates'] < solved['candidates']
+        assert await server.route('GET', path, {}) == narrowed
+        await server.route('DELETE', path, {})
+        with pytest.raises(HttpError):
+            await server.route('GET', path, {})
+        with pytest.raises(HttpError):
+            await server.route('POST', '/solve', {'rows': [], 'limit': 0})
+
+    asyncio.run(requests())
+    assert parseRows([['CRANE', 'gybbb']]) == [('crane', 2 + 3)]
+    for bad in [[['cran', 'BBBBB']], [['crane', 'BBBB']], [['crane', 'BBBBX']], 'crane']:
+        with pytest.raises(ValueError):
+            parseRows(bad)
+
+def test_streamResults():
+    solver = BoardSolver(GuessScorer(WordIndex(allowedGuesses[:3000]), WordIndex(answerWords)))
+    lines = [json.dumps({'id': 1, 'rows': [['crane', '\u2b1b\U0001f7e8\u2b1b\u2b1b\u2b1b']]}),
+             '',
+             json.dumps({'rows': [['crane', 'BYBBB']], 'next': 'zzzzz'}),
+             'not json']
+    serial = list(streamResults(solver, lines, top=3))
+    assert serial[0]['id'] == 1 and len(serial[0]['top']) == 3
+    assert serial[1]['optimal'] is False
+    assert serial[2]['line'] == 4 and 'error' in serial[2]
+    best = serial[0]['top'][0]
+    judged = list(streamResults(solver, [json.dumps({'rows': [['crane', 'BYBBB']], 'next': best})]))
+    assert judged[0]['optimal'] and judged[0]['nextRank'] == 1
+    assert list(streamResults(solver, lines, top=3, workers=2)) == serial
+
+def test_boardsolver_cache():
+    scorer = GuessScorer(WordIndex(allowedGuesses[:3000]), WordIndex(answerWords))
+    cache = BoardCache('lists')
+    solver = BoardSolver(scorer, ENTROPY, cache=cache)
+    record = json.dumps({'rows': [['tarse', 'BBYBB'], ['colin', 'BBBBB']]})
+    results = list(streamResults(solver, [record] * 5, top=3))
+    assert all(result == results[0] for result in results)
+    assert cache.misses == {'candidates': 2, 'guesses': 1}
+    assert cache.hits == {'candidates': 8, 'guesses': 4}
+    assert results[0]['top'] == BoardSolver(scorer, ENTROPY).board(
+        parseRows([['tarse', 'BBYBB'], ['colin', 'BBBBB']])).guesses(3)
+
+def test_scored_commands_need_a_scoring_strategy(monkeypatch, capsys):
+    monkeypatch.setattr(Global, 'strategy', 'heuristic')
+    for command in ['serve', 'stream', 'multi']:
+        assert wordle.run(argparse.Namespace(command=command), []) == 1
+        assert '--strategy entropy' in capsys.readouterr().err
+    with pytest.raises(ScriptError):
+        BoardSolver(GuessScorer(WordIndex(answerWords[:10]), WordIndex(answerWords[:10])), 'heuristic')
+
+def test_book_keyed_before_used_words(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr('book.WORDS_DIR', str(tmp_path))
+    monkeypatch.setattr(Global, 'strategy', ENTROPY)
+    monkeypatch.setattr(Global, 'usePriors', False)
+    answers, guesses = answerWords[:200], allowedGuesses[:300]
+    scorer = GuessScorer(WordIndex(guesses), WordIndex(answers[1:]))
+    saveBook(buildBook(scorer, ENTROPY, (guesses, answers)), ENTROPY)
+    monkeypatch.setattr(wordle, 'loadUsedWords', lambda: UsedWords(answers[:3], 0.0, 'test'))
+    monkeypatch.setattr(Global, 'includeUsed', False)
+    played = Wordle(answers, guesses)
+    assert played.answerWords == answers[3:] and played.book is not None
+    assert loadBook(guesses, answers[:-1], ENTROPY) is None
+    assert 'build-book' in capsys.readouterr().err
+
+def test_session_log_resume(tmp_path):
+    fileName = str(tmp_path / 'session.jsonl')
+    answers, guesses = answerWords[:500], allowedGuesses[:2000]
+    secret = answers[40]
+    w = Wordle(answers, guesses)
+    w.session = SessionLog(fileName, {'strategy': 'heuristic'}, 'lists')
+    for guess in ['crane', 'moist']:
+        row = Row(guess, scorePattern(guess, secret))
+        antiWords, words = w.replayRow(row)
+        w.session.logRow(row, len(words), 0.001)
+    session = lastSession(fileName)
+    assert not session.finished and [row.word for row in session.rows] == ['crane', 'moist']
+    resumed = Wordle(answers, guesses)
+    assert resumed.resume(session.rows) == (antiWords, words) and resumed.board == w.board
+    assert len(resumed.wordleLines) == 3 and resumed.wordleLines[-1] == []
+    SessionLog(fileName, {}, 'lists', session).logEnd(SOLVED, secret)
+    session = readSessions(fileName)[-1]
+    assert session.finished and session.settings == {'strategy': 'heuristic'}
+    boards = list(session.boards())
+    assert [board['next'] for board in boards] == ['crane', 'moist', secret]
+    assert parseRows(boards[2]['rows']) == list(w.board.signature())
+    assert all(row.matches for row in replaySession(resumed, session))
+    with open(fileName, 'a') as outFD:
+        outFD.write('{"session": "cut sh')  # A crash mid-write only loses that line
+    assert len(readSessions(fileName)) == 1
@@ -1,22 +1,36 @@
 #!/usr/bin/env python
 
+import time
+STARTED = time.perf_counter()  # For --profile-startup, so must come before the other imports
+
 import sys
 import os
 import re
-from rich.console import Console
-from typing import NewType, Iterator
-import chime  # type: ignore
+from typing import NewType, Any
+from contextlib import contextmanager
 from argparse import ArgumentParser
 from collections import defaultdict
 from itertools import combinations
-import requests
+import numpy as np
 
 ROOT = os.path.dirname(__file__)
 
 sys.path.append(os.path.join(ROOT, 'lib'))
 from utils import (wordle_getkey, KeyStroke, ScriptError,
     RETURN, BACKSPACE, ALL_WRONG, WRONG_PLACE, RIGHT_PLACE)
-from words import loadWords
+from words import loadCorpus, WordIndex, WORD_LENGTHS
+from constraints import Constraints
+from board import Row, Board
+from patterns import PatternTable, loadPatternTable, patternToStr, wordListsHash
+from strategy import GuessScorer, STRATEGIES, HEURISTIC, ENTROPY
+from book import OpeningBook, buildBook, saveBook, loadBook
+from tree import TreeSolver, saveTree, loadTree, TREE_WIDTH, TREE_DEPTH
+from instrument import instruments, timed
+from cache import BoardCache, CACHE_SIZE
+from usedwords import (loadUsedWords, refreshUsedWords, USED_WORDS_URL, STALE_DAYS)
+from session import SessionLog, Session, readSessions, lastSession, SESSION_FILE, SOLVED, GAVE_UP
+
+IMPORTED = time.perf_counter()
 
 WORDLE_LEN = 5
 
@@ -26,123 +40,256 @@ GuessWords = NewType('GuessWords', list[str])
 
 
 class Global:
-    debug: bool
-    includeUsed: bool
-    useAll: bool
+    debug: bool = False
+    includeUsed: bool = False
+    useAll: bool = False
+    strategy: str = HEURISTIC
+    workers: int = 1
+    useTree: bool = False
+    cacheSize: int = CACHE_SIZE
+    cacheFile: str | None = None
+    wordLen: int = WORDLE_LEN
+    hardMode: bool = False
+    usePriors: bool = False
+    sessionFile: str = SESSION_FILE
+
+
+# Commands that score guesses, which the letter frequency heuristic cannot do
+SCORED_COMMANDS = {'build-book': 'The opening book', 'serve': 'The server',
+                   'stream': 'Streaming boards', 'multi': 'Multi-board play',
+                   'worst-case': 'The worst case report'}
+SESSION_SETTINGS = ['wordLen', 'strategy', 'hardMode', 'usePriors', 'useTree', 'includeUsed',
+                    'useAll']  # The Global settings logged with each session
+
+
+def sessionSettings() -> dict[str, Any]:
+    return {name: getattr(Global, name) for name in SESSION_SETTINGS}
+
+
+def applySettings(settings: dict[str, Any]) -> None:
+    '''Play on as the logged session did, whatever the command line says'''
+    if settings.get('strategy', Global.strategy) not in STRATEGIES \
+            or settings.get('wordLen', Global.wordLen) not in WORD_LENGTHS:
+        raise ScriptError(f'Unknown session settings {settings}')
+    for name in SESSION_SETTINGS:
+        if name in settings:
+            setattr(Global, name, settings[name])
+
+
+class StartupProfile:
+    '''Time spent in each startup phase, reported by --profile-startup'''
+    phases: dict[str, float] = {}
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.phases[name] = cls.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @classmethod
+    def report(cls) -> str:
+        lines = [f'{"imports":<20} {1000 * (IMPORTED - STARTED):8.1f}ms']
+        for name, seconds in cls.phases.items():
+            lines.append(f'{name:<20} {1000 * seconds:8.1f}ms')
+        lines.append(f'{"first prompt":<20} {1000 * (time.perf_counter() - STARTED):8.1f}ms')
+        return '\n'.join(lines)
+
+
+_chime: Any = None
 
 
-class LetterCount:
-    def __init__(self, count: int) -> None:
-        self.count: int = count
-        self.max: bool = True if count == 0 else False
+def getChime() -> Any:
+    '''chime takes a noticeable time to import, so it is only imported for the first sound'''
+    global _chime
+    if _chime is None:
+        import chime  # type: ignore
+        chime.theme('big-sur')
+        _chime = chime
+    return _chime
+
+
+def warning() -> None:
+    getChime().warning()
 
 
 class SecretWordStatusLetter:
+    __slots__ = ('letter', 'used')
+
     def __init__(self, letter: str, used: bool) -> None:
         self.letter = letter
         self.used = used
 
 
 class Wordle:
-    def __init__(self, answerWords: list[str], allowedGuesses: list[str]) -> None:
-        self.excludedLettersRE = ''
-        self.incudedLettersRE = ''
-        self.letterPositionsRE = ''
-        self.letterCount: dict[str, LetterCount] = {}
-        self.lineLetterCount: dict[str, LetterCount] = {}
-        self.letterCountRE = ''
-        self.wordleLines = WordleLines([])
+    def __init__(self, answerWords: list[str], allowedGuesses: list[str],
+                 patternTable: PatternTable | None = None,
+                 answerIndex: WordIndex | None = None,
+                 guessIndex: WordIndex | None = None) -> None:
+        '''
+        answerIndex and guessIndex, if given, are prebuilt indexes of answerWords and
+        allowedGuesses, such as the memory-mapped corpora from words.loadCorpus
+        '''
         self.answerWords = answerWords
+        self.answerIndex = answerIndex if answerIndex is not None else WordIndex(answerWords)
+        self.wordLen = self.answerIndex.codes.shape[1]
+        self.constraints = Constraints(self.wordLen)
+        self.board = Board()
+        self.wordleLines = WordleLines([])
+        self.candidates: np.ndarray | None = None
         self.allowedGuesses = allowedGuesses
+        self.guessIndex = guessIndex
+        self.patternTable = patternTable
+        self.scorer: GuessScorer | None = None
         self.newWordleLine()
-        if not Global.includeUsed:
-            self.removeUsedWords()
+        # The lists as loaded, before the used words are removed. The opening book and solve
+        # tree are keyed on them, as a book or tree built for every answer is still good play
+        # once some are removed.
+        self.corpusAnswers = answerWords
+        self.corpusGuesses = allowedGuesses
+        # The used-word store only holds Wordle's five letter answers
+        if not Global.includeUsed and self.wordLen == WORDLE_LEN:
+            with StartupProfile.phase('used-word removal'):
+                self.removeUsedWords()
+        self.baseAnswerIndex = self.answerIndex
+        self.book: OpeningBook | None = None
+        if Global.strategy != HEURISTIC:
+            with StartupProfile.phase('opening book'):
+                self.book = loadBook(self.corpusGuesses, self.corpusAnswers, Global.strategy,
+                                     Global.usePriors)
+        self.tree: dict | None = None
+        if Global.useTree:
+            with StartupProfile.phase('solve tree'):
+                self.tree = loadTree(self.corpusGuesses, self.corpusAnswers)
+            if self.tree is None:
+                print('No solve tree for these word lists, run "wordle solve-tree" to build one',
+                      file=sys.stderr)
+        self.treeNode = self.tree
+        self.cache: BoardCache | None = None
+        if Global.cacheSize > 0:
+            with StartupProfile.phase('board cache'):
+                self.cache = BoardCache(wordListsHash(self.allowedGuesses, self.answerWords),
+                                        Global.cacheSize, Global.cacheFile)
+        self.session: SessionLog | None = None
+        self._console: Any = None
 
     def newWordleLine(self) -> None:
         self.wordleLines.append(WordleLine([]))
 
+    def reset(self) -> None:
+        '''Start a new game, keeping the word lists and indexes'''
+        self.constraints = Constraints(self.wordLen)
+        self.board = Board()
+        self.wordleLines = WordleLines([])
+        self.candidates = None
+        self.treeNode = self.tree
+        self.newWordleLine()
+        if self.answerIndex is not self.baseAnswerIndex:
+            self.answerIndex = self.baseAnswerIndex
+            self.answerWords = self.answerIndex.words
+            self.scorer = None
+
+    def useAllowedGuesses(self) -> None:
+        '''Fall back to searching all the allowed guesses for the answer'''
+        self.answerWords = self.allowedGuesses
+        if self.guessIndex is None:
+            self.guessIndex = WordIndex(self.allowedGuesses)
+        self.answerIndex = self.guessIndex
+        self.candidates = None
+        self.scorer = None
+
     def removeUsedWords(self):
-        r = requests.get('https://www.stadafa.com/2021/09/every-worlde-word-so-far-updated-daily.html')
-        for line in r.content.splitlines():
-            try:
-                usedWord = re.search(r'^<p>[0-9]+\. (\w+?) ', line.decode())
-                if usedWord:
-                    del(self.answerWords[self.answerWords.index(usedWord.group(1).lower())])
-            except ValueError:
-                continue
+        '''Drop the words in the local used-word store, never touches the network'''
+        usedWords = loadUsedWords()
+        if usedWords is None:
+            print('No used-word store yet, run "wordle refresh-used" to create one',
+                  file=sys.stderr)
+            return
+        if usedWords.ageDays > STALE_DAYS:
+            print(f'The used-word store is {usedWords.ageDays:.0f} days old, '
+                  'run "wordle refresh-used" to update it', file=sys.stderr)
+        if Global.debug:
+            print(f'Removing {usedWords}')
+        sharedGuesses = self.allowedGuesses is self.answerWords
+        self.answerIndex = self.answerIndex.without(usedWords.words)
+        self.answerWords = self.answerIndex.words
+        if sharedGuesses:
+            self.allowedGuesses = self.answerWords
 
-    def getColumns(self) -> Iterator[list[KeyStroke]]:
-        for i in range(len(self.wordleLines[0])):
-            yield [cells[i] for cells in self.wordleLines]
+    @timed('makeConstraints')
+    def makeConstraints(self) -> None:
+        '''Commit the rows completed since the last call, so each row is only folded in once'''
+        for line in self.wordleLines[len(self.board):]:
+            if len(line) == self.wordLen:
+                self.commitRow(Row.fromLine(line))
 
-    def addLineLetterCount(self, letter: str, increment: int) -> None:
-        if letter in self.lineLetterCount:
-            if increment > 0:
-                self.lineLetterCount[letter].count += increment
-            else:
-                self.lineLetterCount[letter].max = True
-        else:
-            self.lineLetterCount[letter] = LetterCount(increment)
-
-    def resetLineLetterCount(self) -> None:
-        self.lineLetterCount = {}
-
-    def mergeLineLetterCount(self) -> None:
-        for letter, letterCount in self.lineLetterCount.items():
-            if letter in self.letterCount:
-                if letterCount.count > self.letterCount[letter].count:
-                    self.letterCount[letter].count = letterCount.count
-                if letterCount.max:
-                    self.letterCount[letter].max = letterCount.max
-            else:
-                self.letterCount[letter] = letterCount
-
-    def makeREs(self) -> None:
-        self.letterCount = {}
-        self.letterCountRE = ''
-        self.letterPositionsRE = ''
-        # Generate positional re characters for each column
-        for slot in self.getColumns():
-            correct = ''
-            notPostition = '[^'
-            for key in slot:
-                if key.keyType == RIGHT_PLACE:
-                    correct = key.key
-                if key.keyType == WRONG_PLACE:
-                    notPostition += key.key
-            if correct:
-                self.letterPositionsRE += correct
-            elif len(notPostition) > 2:
-                self.letterPositionsRE += notPostition + ']'
-            else:
-                self.letterPositionsRE += '.'
-        # Go over each line and work out how many of each letter is used
-        for row in self.wordleLines:
-            for key in row:
-                if key.keyType in [RIGHT_PLACE, WRONG_PLACE]:
-                    self.addLineLetterCount(key.key, 1)
-                else:
-                    self.addLineLetterCount(key.key, 0)
-            self.mergeLineLetterCount()
-            self.resetLineLetterCount()
+    def commitRow(self, row: Row) -> None:
+        self.board = self.board.add(row)
+        self.constraints.addPattern(row.word, row.pattern)
+
+    def replayRow(self, row: Row,
+                  rankGuesses: bool = True) -> tuple[GuessWords, GuessWords] | None:
+        '''
+        Commit a logged row as if it had just been entered, returning (antiWords, words),
+        or None when no word fits. Without rankGuesses only the solve tree is followed.
+        '''
+        self.wordleLines[-1] = WordleLine(row.toLine())
+        self.makeConstraints()
+        words = self.calculateWords()
+        if len(words) == 0 and self.answerWords != self.allowedGuesses:
+            self.useAllowedGuesses()
+            words = self.calculateWords()
+        if len(words) == 0:
+            return None
+        antiWords = self.mkGuessList(words) if rankGuesses else self.walkTree() or GuessWords([])
+        self.newWordleLine()
+        return antiWords, words
 
-        for letter, count in self.letterCount.items():
-            countStr = f'{count.count}' if count.max else f'{count.count},'
-            self.letterCountRE += f'(?=^[^{letter}]*({letter}[^{letter}]*){{{countStr}}}$)'
+    def resume(self, rows: list[Row]) -> tuple[GuessWords, GuessWords] | None:
+        '''Rebuild the board from a session's rows, only ranking guesses for the last one'''
+        result = None
+        for i, row in enumerate(rows):
+            result = self.replayRow(row, rankGuesses=i == len(rows) - 1)
+            if result is None:
+                return None
+        return result
 
+    def cacheKey(self, kind: str) -> tuple:
+        '''Board cache key, the guesses also depend on the strategy'''
+        words = 'answers' if self.answerIndex is self.baseAnswerIndex else 'allowed'
+        strategy = ''
+        if kind == 'guesses':
+            strategy = Global.strategy + ('-hard' if Global.hardMode else '') \
+                + ('-priors' if Global.usePriors and Global.strategy == ENTROPY else '')
+        return kind, words, strategy, self.board.signature()
+
+    @timed('calculateWords')
     def calculateWords(self) -> GuessWords:
-        words = GuessWords([])
-        positionRE = self.letterPositionsRE
-        letterCountRE = self.letterCountRE
+        '''
+        Narrow the candidates left by the previous row with the current constraints. The
+        constraints only ever tighten, so the earlier candidates never need rescanning.
+        '''
         if Global.debug:
-            print(f'letterCountRE: {letterCountRE}')
-            print(f'positionRE: {positionRE}')
-        for word in self.answerWords:
-            if re.search(letterCountRE, word) \
-                    and re.search(positionRE, word):
-                words.append(word)
-        return words
+            print(f'constraints: {self.constraints}')
+        key = self.cacheKey('candidates')
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            self.candidates = cached
+        else:
+            scanned = self.answerIndex if self.candidates is None else self.candidates
+            instruments.count('calculateWords.scanned', len(scanned))
+            self.candidates = self.constraints.filter(self.answerIndex, self.candidates)
+            if self.cache is not None:
+                self.cache.put(key, self.candidates)
+        instruments.count('calculateWords.candidates', len(self.candidates))
+        candidates = self.candidates
+        if Global.usePriors:  # Most likely first
+            candidates = candidates[np.argsort(-self.answerIndex.priors[candidates], kind='stable')]
+        return GuessWords(self.answerIndex.select(candidates))
 
+    @timed('mkAntiWordList')
     def mkAntiWordList(self, words: list[str]) -> GuessWords:
         '''
         Things to try:
@@ -155,14 +302,13 @@ class Wordle:
           letters from the letters list above.
         '''
 
+        answerPool, guessPool = self.guessPools()
         lettersToTryDict: dict[str, int] = defaultdict(int)
         goodLetters: set[str] = set()
         shortListWords: list[str] = []
         # Get "good" letters
-        for line in self.wordleLines:
-            for key in line:
-                if key.keyType in [RIGHT_PLACE, WRONG_PLACE]:
-                    goodLetters.add(key.key)
+        for row in self.board:
+            goodLetters |= row.goodLetters()
         for word in words:
             for ch in word:
                 if ch not in goodLetters:
@@ -173,12 +319,14 @@ class Wordle:
             print('Letters to try', lettersToTry)
         if len(lettersToTry) < 2:
             return GuessWords([])
-        for numToTry in range(5, 1, -1):  # Try to find words with five letters first, then 4, ...
+        for numToTry in range(min(5, self.wordLen), 1, -1):  # Try five letters first, then 4, ...
             for lettersCombination in combinations(lettersToTry, numToTry):
+                instruments.count('mkAntiWordList.combinations')
                 wordsRE = ''
                 for letter in lettersCombination:
                     wordsRE += f'(?=.*{letter})'
-                for word in self.answerWords:  # First try words that could be the answer
+                instruments.count('mkAntiWordList.regexEvaluations', len(answerPool))
+                for word in answerPool:  # First try words that could be the answer
                     if re.search(wordsRE, word):
                         if word not in shortListWords:
                             shortListWords.append(word)
@@ -186,7 +334,8 @@ class Wordle:
                                 print(f'Found "{word}" in AnswerWords with {lettersCombination}')
                 if len(shortListWords) > 1:  # Offer more than one word
                     break
-                for word in self.allowedGuesses:  # Try words that are unlikely to be the answer
+                instruments.count('mkAntiWordList.regexEvaluations', len(guessPool))
+                for word in guessPool:  # Try words that are unlikely to be the answer
                     if re.search(wordsRE, word):
                         if word not in shortListWords:
                             shortListWords.append(word)
@@ -198,6 +347,111 @@ class Wordle:
                 break
         return GuessWords(shortListWords)
 
+    def getGuessIndex(self) -> WordIndex:
+        if self.allowedGuesses is self.answerWords:
+            self.guessIndex = self.answerIndex
+        elif self.guessIndex is None:
+            self.guessIndex = WordIndex(self.allowedGuesses)
+        return self.guessIndex
+
+    def getScorer(self) -> GuessScorer:
+        if self.scorer is None:
+            self.scorer = GuessScorer(self.getGuessIndex(), self.answerIndex, self.patternTable,
+                                      Global.workers, Global.usePriors)
+        return self.scorer
+
+    def hardModeGuesses(self) -> np.ndarray | None:
+        '''Indexes of the allowed guesses that use every revealed hint, None outside hard mode'''
+        if not Global.hardMode or not len(self.board):
+            return None
+        return self.constraints.hints().filter(self.getGuessIndex())
+
+    def hardModeAllows(self, words: list[str]) -> list[str]:
+        '''words less any that hard mode would reject'''
+        if not Global.hardMode or not len(self.board) or not words:
+            return words
+        index = WordIndex(words)
+        return index.select(self.constraints.hints().filter(index))
+
+    def guessPools(self) -> tuple[list[str], list[str]]:
+        '''The answer words and allowed guesses the heuristic may pick from'''
+        guesses = self.hardModeGuesses()
+        if guesses is None:
+            return self.answerWords, self.allowedGuesses
+        answers = self.constraints.hints().filter(self.answerIndex)
+        return self.answerIndex.select(answers), self.getGuessIndex().select(guesses)
+
+    def walkTree(self) -> GuessWords | None:
+        '''Follow the solve tree down the row just committed, None once play has left the tree'''
+        if self.treeNode is None:
+            return None
+        row = self.board[-1]
+        if row.word != self.treeNode['guess']:
+            self.treeNode = None
+            return None
+        self.treeNode = self.treeNode.get('next', {}).get(patternToStr(row.pattern, self.wordLen))
+        if self.treeNode is None or not self.hardModeAllows([self.treeNode['guess']]):
+            self.treeNode = None  # Off the tree, or its next guess breaks hard mode
+            return None
+        return GuessWords([self.treeNode['guess']])
+
+    @timed('mkGuessList')
+    def mkGuessList(self, words: GuessWords) -> GuessWords:
+        '''
+        Rank the next guesses with the selected strategy, or take them from the solve tree or
+        the opening book when they cover this row, or from the board cache when this board
+        has been seen before
+        '''
+        treeWords = self.walkTree()
+        if treeWords is not None:
+            return treeWords
+        if self.book is not None and len(self.board) == 1:
+            bookWords = self.book.secondGuesses(self.board[0].word,
+                                                patternToStr(self.board[0].pattern, self.wordLen))
+            if bookWords is not None:
+                bookWords = self.hardModeAllows(bookWords)
+            if bookWords:
+                return GuessWords(bookWords)
+        key = self.cacheKey('guesses')
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return GuessWords(cached)
+        if Global.strategy == HEURISTIC or self.candidates is None:
+            guesses = self.mkAntiWordList(words)
+        else:
+            guesses = GuessWords(self.getScorer().rank(self.candidates, Global.strategy,
+                                                       guesses=self.hardModeGuesses()))
+        if self.cache is not None:
+            self.cache.put(key, guesses)
+        return guesses
+
+    def openingGuesses(self) -> GuessWords:
+        '''
+        Ranked first guesses, from the solve tree or opening book if there is one.
+        Starts a new game.
+        '''
+        self.reset()
+        if self.tree is not None:
+            return GuessWords([self.tree['guess']])
+        if self.book is not None:
+            return GuessWords(self.book.first)
+        self.candidates = np.arange(len(self.answerIndex))
+        return self.mkGuessList(GuessWords(self.answerWords))
+
+    def recordRow(self, words: GuessWords, **fields: Any) -> None:
+        '''Emit the instrumentation for the row just committed'''
+        row = self.board[-1]
+        instruments.emitRow(strategy=Global.strategy, row=len(self.board), guess=row.word,
+                            pattern=patternToStr(row.pattern, self.wordLen),
+                            candidates=len(words), **fields)
+
+    @property
+    def console(self) -> Any:
+        if self._console is None:
+            from rich.console import Console  # Only needed once there is a tile to colour
+            self._console = Console()
+        return self._console
+
     def printLetter(self, key: KeyStroke) -> bool:
         if key.keyType == BACKSPACE:
             print('\b \b', flush=True, end='')
@@ -223,8 +477,14 @@ class Wordle:
         max = 20 if len(words) > 20 else len(words)
         print(f'\nFound {len(words)} words', end='')
         print(f', showing the first {max}:' if len(words) > max else ':')
+        chances = self.wordChances(words) if Global.usePriors else None
         for i in range(max):
-            print(words[i])
+            print(words[i] if chances is None else f'{words[i]}  {100 * chances[i]:4.1f}%')
+
+    def wordChances(self, words: list[str]) -> np.ndarray:
+        '''Each word's share of the candidates' prior probability'''
+        priors = self.answerIndex.priors[[self.answerIndex.position[w] for w in words]]
+        return priors / priors.sum()
 
     def checkIllegal(self, key: KeyStroke) -> bool:
         '''
@@ -264,9 +524,10 @@ class Wordle:
                     return i
         return -1
 
+    @timed('makeGYB')
     def makeGYB(self, guessWord: str, secretWord: str) -> WordleLine:
         secretWordStatus = [SecretWordStatusLetter(x, False) for x in secretWord]
-        resultWord = WordleLine([KeyStroke('', 0) for _ in range(WORDLE_LEN)])
+        resultWord = WordleLine([KeyStroke('', 0) for _ in range(len(secretWord))])
         # Check Green
         for col, c in enumerate(guessWord):
             if c == secretWordStatus[col].letter:
@@ -291,14 +552,15 @@ class Wordle:
         Event loop to allow checking each key as it is entered so illegal key combinations
         can be blocked
         '''
-        self.console = Console()
         retry = False
         key: KeyStroke | None = None
+        rowStart = 0.0
         while True:
             if retry:
                     retry = False
             else:
-                key = wordle_getkey(chime.warning)
+                key = wordle_getkey(warning)
+                rowStart = time.perf_counter()
             if key is None:
                 continue
             line = self.wordleLines[-1]
@@ -307,44 +569,222 @@ class Wordle:
                     self.printLetter(key)
                     del(line[-1])
                 else:
-                    chime.warning()
+                    warning()
             elif key.keyType == RETURN:
-                if len(line) == WORDLE_LEN:
+                if len(line) == self.wordLen:
                     self.printLetter(key)
                     if self.allGreen():
-                        chime.theme('zelda')  # Yup, cheesy
-                        chime.success()
+                        getChime().theme('zelda')  # Yup, cheesy
+                        getChime().success()
                         print("Success!")
+                        if self.session is not None:
+                            self.session.logEnd(SOLVED, ''.join(k.key for k in line))
                         break
-                    '''Do stuff to create and processes REs, then print likely words'''
-                    self.makeREs()
+                    '''Do stuff to create and process the constraints, then print likely words'''
+                    self.makeConstraints()
                     words = self.calculateWords()
                     if len(words) == 0:
                         if self.answerWords != self.allowedGuesses:
                             print('Retrying with all words, not just allowed guesses')
-                            self.answerWords = self.allowedGuesses
+                            self.useAllowedGuesses()
                             retry = True
                             continue
-                        chime.theme('zelda')
-                        chime.error()
+                        getChime().theme('zelda')
+                        getChime().error()
                         print('No words found, so giving up️')
+                        if self.session is not None:
+                            self.session.logEnd(GAVE_UP)
                         return 1
-                    antiWords = self.mkAntiWordList(words)
+                    antiWords = self.mkGuessList(words)
+                    self.recordRow(words)
+                    if self.session is not None:
+                        self.session.logRow(self.board[-1], len(words),
+                                            time.perf_counter() - rowStart)
                     self.printWords(antiWords, words)
                     self.newWordleLine()
                     print('> ', end='', flush=True)
                 else:
-                    chime.warning()
-            elif len(line) == WORDLE_LEN:
-                chime.warning()
+                    warning()
+            elif len(line) == self.wordLen:
+                warning()
             elif self.checkIllegal(key):
-                chime.warning()
+                warning()
             else:
                 self.printLetter(key)
                 line.append(key)
         return 0
 
 
+def buildBookCommand(wordle: Wordle) -> int:
+    book = buildBook(wordle.getScorer(), Global.strategy,
+                     (wordle.corpusGuesses, wordle.corpusAnswers))
+    fileName = saveBook(book, Global.strategy, wordle.wordLen, Global.usePriors)
+    print(f'Wrote {fileName}: first guess "{book.first[0]}", '
+          f'{len(book.second)} second guess entries')
+    return 0
+
+
+def refreshUsedCommand(source: str, listWords: bool) -> int:
+    try:
+        usedWords, added = refreshUsedWords(source)
+    except ScriptError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    if listWords:
+        print('\n'.join(usedWords.words))
+    else:
+        print(f'Added {added} words, the store now has {usedWords}')
+    return 0
+
+
+def solveTreeCommand(wordle: Wordle, width: int, depth: int) -> int:
+    solver = TreeSolver(wordle.getScorer(), width, depth)
+    candidates = np.arange(len(wordle.answerIndex))
+    start = time.perf_counter()
+    cost = solver.solve(candidates)
+    if cost == float('inf'):
+        print(f'No tree solves every word within {depth} guesses', file=sys.stderr)
+        return 1
+    expected = cost / len(candidates)
+    fileName = saveTree(solver.build(candidates), wordle.corpusGuesses, wordle.corpusAnswers,
+                        expected)
+    print(f'Wrote {fileName}: {expected:.4f} expected guesses, {solver.nodes} nodes searched '
+          f'in {time.perf_counter() - start:.1f}s')
+    return 0
+
+
+def serveCommand(wordle: Wordle, host: str, port: int) -> int:
+    import asyncio
+    from boardsolver import BoardSolver
+    from server import serve
+    solver = BoardSolver(wordle.getScorer(), Global.strategy, wordle.book, wordle.cache)
+    if Global.workers > 1:  # Requests are scored on executor threads, forking then can deadlock
+        solver.scorer.startPool()
+    try:
+        asyncio.run(serve(solver, host, port))
+    except KeyboardInterrupt:
+        print()
+    return 0
+
+
+def streamCommand(wordle: Wordle, fileName: str, top: int) -> int:
+    import json
+    from boardsolver import BoardSolver
+    from stream import streamResults
+    solver = BoardSolver(wordle.getScorer(), Global.strategy, wordle.book, wordle.cache)
+    inFD = sys.stdin if fileName == '-' else open(fileName)
+    try:
+        for result in streamResults(solver, inFD, top, Global.workers):
+            print(json.dumps(result))
+    except BrokenPipeError:
+        pass
+    finally:
+        if inFD is not sys.stdin:
+            inFD.close()
+    return 0
+
+
+def multiCommand(wordle: Wordle, boards: int, simulate: int | None, seed: int) -> int:
+    from boardsolver import BoardSolver
+    from multiboard import MultiBoardSolver, parseGuessLine, simulateMulti, describeBoards, maxRows
+    multiSolver = MultiBoardSolver(BoardSolver(wordle.getScorer(), Global.strategy,
+                                                   cache=wordle.cache))
+    if simulate:
+        print(simulateMulti(multiSolver, boards, simulate, seed))
+        return 0
+    game = multiSolver.game(boards)
+    print(f'Playing {boards} boards in {maxRows(boards)} rows. After each guess enter the guess '
+          'and a G/Y/B pattern for each unsolved board, e.g. "crane BBYBG GGBBB ..."')
+    print(f'Try: {", ".join(multiSolver.rank(game, 5))}')
+    while not game.solved:
+        try:
+            line = input('> ')
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return 0
+        try:
+            game.addGuess(*parseGuessLine(line, wordle.wordLen))
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            continue
+        print(describeBoards(game))
+        if not game.solved:
+            guesses = multiSolver.rank(game, 5)
+            if not guesses:
+                print('No words fit a board, so giving up')
+                return 1
+            print(f'Try: {", ".join(guesses)}')
+    print(f'Success in {len(game.guesses)}!')
+    return 0
+
+
+def worstCaseCommand(wordle: Wordle, top: int) -> int:
+    from boardsolver import BoardSolver
+    from worstcase import worstCaseReport
+    start = time.perf_counter()
+    solver = BoardSolver(wordle.getScorer(), Global.strategy, wordle.book, wordle.cache)
+    print(worstCaseReport(solver, top))
+    print(f'Wall time: {time.perf_counter() - start:.2f}s')
+    return 0
+
+
+def replayCommand(wordle: Wordle, sessions: list[Session]) -> int:
+    from session import replaySession, replayReport
+    played = [session for session in sessions if session.settings == sessions[0].settings]
+    if len(played) < len(sessions):
+        print(f'Skipping {len(sessions) - len(played)} sessions played with other settings '
+              'than the first', file=sys.stderr)
+    start = time.perf_counter()
+    replayed = [row for session in played for row in replaySession(wordle, session)]
+    print(replayReport(replayed, len(played), time.perf_counter() - start))
+    return 0
+
+
+def resumeSession(wordle: Wordle, session: Session) -> bool:
+    '''Show the session's rows and the suggestions after the last, False if no word fits'''
+    print(f'Resuming session {session.id} after {len(session.rows)} rows:')
+    if session.words != wordListsHash(wordle.allowedGuesses, wordle.answerWords):
+        print('The word lists have changed since, so the candidates may differ', file=sys.stderr)
+    for row in session.rows:
+        for key in row.toLine():
+            wordle.printLetter(key)
+        print()
+    result = wordle.resume(session.rows)
+    if result is None:
+        print('No words fit the resumed rows', file=sys.stderr)
+        return False
+    wordle.printWords(*result)
+    return True
+
+
+def loadTestCommand(answerWords: list[str], allowedGuesses: list[str], args) -> int:
+    import asyncio
+    from loadtest import makeBoards, loadTest, loadTestReport
+    boards = makeBoards(answerWords, allowedGuesses, args.requests, args.seed)
+    try:
+        latencies, errors, wallTime = asyncio.run(loadTest(args.url, boards, args.concurrency))
+    except OSError as e:
+        print(f'Unable to load test {args.url}: {e}', file=sys.stderr)
+        return 1
+    print(loadTestReport(latencies, errors, wallTime))
+    return 0
+
+
+def benchCommand(wordle: Wordle, limit: int | None) -> int:
+    from bench import runBench, runBenchParallel, benchReport
+    secrets = list(wordle.answerWords[:limit])
+    start = time.perf_counter()
+    if Global.workers > 1:
+        results = runBenchParallel(wordle, secrets, Global.workers)
+    else:
+        results = runBench(wordle, secrets)
+    priors = dict(zip(wordle.answerWords, wordle.answerIndex.priors.tolist()))
+    print(benchReport(results, time.perf_counter() - start, priors))
+    if wordle.cache is not None and Global.workers == 1:  # Workers' caches die with them
+        print(wordle.cache.stats())
+    return 0
+
+
 def main():
     parser = ArgumentParser(prog='wordle',
                             description='A Wordle solver')
@@ -355,25 +795,239 @@ def main():
     parser.add_argument('--use-all', '-u',
                         action='store_true',
                         help='Use all words, not just allowed guesses')
+    parser.add_argument('--strategy', '-s', choices=STRATEGIES, default=HEURISTIC,
+                        help='How to rank the next guesses: letter frequency heuristic (default), '
+                             'expected information or smallest worst case')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report the time to the first prompt, broken down by phase')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes for benchmarks and guess scoring (default 1)')
+    parser.add_argument('--tree', '-t', action='store_true',
+                        help='Play from the decision tree built by solve-tree while it applies')
+    parser.add_argument('--length', '-l', type=int, choices=WORD_LENGTHS, default=WORDLE_LEN,
+                        help=f'Word length, {WORD_LENGTHS[0]} to {WORD_LENGTHS[-1]} '
+                             f'(default {WORDLE_LEN}), each needs its own word lists')
+    parser.add_argument('--hard', action='store_true',
+                        help='Hard mode: only suggest guesses that use every revealed hint')
+    parser.add_argument('--priors', action='store_true',
+                        help='Weight candidates by word frequency for display and the entropy '
+                             'strategy, rather than treating them as equally likely')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help='Boards to keep candidates and guesses for, 0 turns the cache off '
+                             f'(default {CACHE_SIZE})')
+    parser.add_argument('--cache-file', metavar='FILE',
+                        help='Load the board cache from FILE and save it back on exit')
+    parser.add_argument('--stats-file', metavar='FILE',
+                        help='Append per-row timers and counters to FILE as JSON lines')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='Profile the whole run with cProfile and dump the stats to FILE')
+    parser.add_argument('--resume', '-r', action='store_true',
+                        help='Carry on with the last session if it was interrupted, with the '
+                             'settings it was played with')
+    parser.add_argument('--session-file', metavar='FILE', default=SESSION_FILE,
+                        help='Log that play appends its rows to, read by --resume and replay '
+                             '(default wordle-words/session.jsonl)')
+    commands = parser.add_subparsers(dest='command', title='commands',
+                                     description='Play interactively when no command is given')
+    commands.add_parser('build-book',
+                        help='Build the opening book of first and second guesses for --strategy')
+    refreshParser = commands.add_parser('refresh-used',
+                                        help='Update the local store of used answer words')
+    refreshParser.add_argument('--source', default=USED_WORDS_URL,
+                               help='URL or local file to read the used words from '
+                                    f'(default {USED_WORDS_URL})')
+    refreshParser.add_argument('--list', '-l', action='store_true',
+                               help='Print all the used words afterwards')
+    treeParser = commands.add_parser('solve-tree',
+                                     help='Search for the decision tree with the fewest expected '
+                                          'guesses, play it with --tree')
+    treeParser.add_argument('--width', type=int, default=TREE_WIDTH,
+                            help=f'Guesses tried at each node (default {TREE_WIDTH})')
+    treeParser.add_argument('--depth', type=int, default=TREE_DEPTH,
+                            help=f'Most guesses allowed for any word (default {TREE_DEPTH})')
+    serveParser = commands.add_parser('serve', help='Run the solver as an HTTP/JSON service')
+    serveParser.add_argument('--host', default='127.0.0.1')
+    serveParser.add_argument('--port', type=int, default=8000)
+    loadParser = commands.add_parser('loadtest', help='Load test a running solver service')
+    loadParser.add_argument('--url', default='http://127.0.0.1:8000')
+    loadParser.add_argument('--requests', '-n', type=int, default=1000,
+                            help='Random boards to send (default 1000)')
+    loadParser.add_argument('--concurrency', '-c', type=int, default=8,
+                            help='Concurrent connections (default 8)')
+    loadParser.add_argument('--seed', type=int, default=0)
+    streamParser = commands.add_parser('stream',
+                                       help='Evaluate board states read as JSON lines, see '
+                                            'lib/stream.py for the format')
+    streamParser.add_argument('file', nargs='?', default='-',
+                              help='JSONL file of boards (default stdin)')
+    streamParser.add_argument('--top', type=int, default=5,
+                              help='Top guesses to output per board (default 5)')
+    multiParser = commands.add_parser('multi',
+                                      help='Play several boards at once, as in Quordle or Octordle')
+    multiParser.add_argument('--boards', '-b', type=int, default=4,
+                             help='Boards per game (default 4)')
+    multiParser.add_argument('--simulate', type=int, metavar='N',
+                             help='Play N random games headless and report the guess counts')
+    multiParser.add_argument('--seed', type=int, default=0)
+    worstParser = commands.add_parser('worst-case',
+                                      help='Find the answers that take the --strategy the most '
+                                           'guesses, the largest buckets and an adversary game')
+    worstParser.add_argument('--top', type=int, default=20,
+                             help='Hardest words to list (default 20)')
+    replayParser = commands.add_parser('replay',
+                                       help='Play logged sessions again headless, with the first '
+                                            'session\'s settings, and report the row latency')
+    replayParser.add_argument('file', nargs='?',
+                              help='Session log (default the --session-file)')
+    replayParser.add_argument('--session', metavar='ID', help='Only replay this session')
+    replayParser.add_argument('--boards', action='store_true',
+                              help='Print the board before each guess as JSON lines for '
+                                   '"wordle stream" instead')
+    benchParser = commands.add_parser('bench',
+                                      help='Play every answer word headless and report the results')
+    benchParser.add_argument('--limit', '-n', type=int,
+                             help='Only play the first N answer words')
     args = parser.parse_args()
     Global.debug = args.debug
     Global.includeUsed = args.include_used
     Global.useAll = args.use_all
-    answerWords, allowedGuesses = loadWords()
+    Global.strategy = args.strategy
+    Global.workers = max(1, args.workers)
+    Global.useTree = args.tree
+    Global.cacheSize = max(0, args.cache_size)
+    Global.cacheFile = args.cache_file
+    Global.wordLen = args.length
+    Global.hardMode = args.hard
+    Global.usePriors = args.priors
+    Global.sessionFile = args.session_file
+    if args.command in ['bench', 'worst-case']:
+        Global.includeUsed = True  # Every answer word is played, used or not
+    try:
+        sessions = selectSessions(args)
+    except ScriptError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    if args.stats_file:
+        instruments.enable(args.stats_file)
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return run(args, sessions)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f'cProfile stats written to {args.cprofile}, '
+                  f'view them with: python -m pstats {args.cprofile}', file=sys.stderr)
+        instruments.close()
+
+
+def selectSessions(args) -> list[Session]:
+    '''The logged sessions to replay or resume, whose settings then apply'''
+    if args.command == 'replay':
+        sessions = readSessions(args.file or Global.sessionFile)
+        if args.session is not None:
+            sessions = [session for session in sessions if session.id == args.session]
+        if not sessions:
+            raise ScriptError('No sessions to replay')
+    elif args.resume and args.command is None:
+        session = lastSession(Global.sessionFile)
+        if session is None or session.finished:
+            print('No interrupted session to resume, starting a new one', file=sys.stderr)
+            return []
+        sessions = [session]
+    else:
+        return []
+    applySettings(sessions[0].settings)
+    return sessions
+
+
+def run(args, sessions: list[Session]) -> int:
+    if args.command == 'refresh-used':
+        return refreshUsedCommand(args.source, args.list)
+    if args.command == 'replay' and args.boards:  # Needs no word lists
+        import json
+        for session in sessions:
+            for record in session.boards():
+                print(json.dumps(record))
+        return 0
+    if Global.strategy == HEURISTIC and args.command in SCORED_COMMANDS:
+        print(f'{SCORED_COMMANDS[args.command]} needs --strategy entropy or minimax',
+              file=sys.stderr)
+        return 1
+    with StartupProfile.phase('loadWords'):
+        try:
+            answerIndex, guessIndex = loadCorpus(Global.wordLen)
+        except ScriptError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        answerWords, allowedGuesses = answerIndex.words, guessIndex.words
     if Global.debug:
         print(f'Loaded {len(answerWords)} answer words and {len(allowedGuesses)} allowed guess words')
-    chime.theme('big-sur')
-    wordle = Wordle(answerWords, answerWords if Global.useAll else allowedGuesses)
+    if args.command == 'loadtest':
+        return loadTestCommand(answerWords, allowedGuesses, args)
+    patternTable = None
+    # The heuristic never scores patterns, so only load the table when something will
+    if Global.strategy != HEURISTIC or args.command == 'solve-tree':
+        with StartupProfile.phase('index build'):
+            patternTable = loadPatternTable(allowedGuesses, answerWords)
+    if Global.useAll:
+        wordle = Wordle(answerWords, answerWords, patternTable, answerIndex, answerIndex)
+    else:
+        wordle = Wordle(answerWords, allowedGuesses, patternTable, answerIndex, guessIndex)
+    try:
+        return runCommand(wordle, args, sessions)
+    finally:
+        if wordle.cache is not None:
+            wordle.cache.save()
+
+
+def runCommand(wordle: Wordle, args, sessions: list[Session]) -> int:
+    '''Run the command, or play interactively, with the loaded Wordle'''
+    if args.command == 'build-book':
+        return buildBookCommand(wordle)
+    if args.command == 'bench':
+        return benchCommand(wordle, args.limit)
+    if args.command == 'solve-tree':
+        return solveTreeCommand(wordle, args.width, args.depth)
+    if args.command == 'serve':
+        return serveCommand(wordle, args.host, args.port)
+    if args.command == 'stream':
+        return streamCommand(wordle, args.file, args.top)
+    if args.command == 'worst-case':
+        return worstCaseCommand(wordle, args.top)
+    if args.command == 'multi':
+        return multiCommand(wordle, max(1, args.boards), args.simulate, args.seed)
+    if args.command == 'replay':
+        return replayCommand(wordle, sessions)
+    session = sessions[0] if sessions else None
+    wordle.session = SessionLog(Global.sessionFile, sessionSettings(),
+                                wordListsHash(wordle.allowedGuesses, wordle.answerWords), session)
+    if session is not None:
+        if not resumeSession(wordle, session):
+            return 1
+    elif wordle.tree is not None:
+        print(f'Solve tree opens with: {wordle.tree["guess"]}')
+    elif wordle.book is not None:
+        print(f'Opening book suggests: {", ".join(wordle.book.first[:5])}')
+    if args.profile_startup:
+        print(StartupProfile.report(), file=sys.stderr)
     print(f'''Enter the results from the Wordle screen. Press:
     - ALT+<letter> for a black tile
     - Just <letter> for a yellow tile
     - Shift+<letter> for a green tile
-    - Enter once all {WORDLE_LEN} letters have been entered.
+    - Enter once all {wordle.wordLen} letters have been entered.
 > ''', end='')
     try:
         return(wordle.event_loop())
     except KeyboardInterrupt:
         print()
+        if wordle.session is not None and wordle.session.rows:
+            print('Session saved, carry on with: wordle --resume', file=sys.stderr)
+        return 0
     except ScriptError as e:
         print(str(e), file=sys.stderr)
         return 1